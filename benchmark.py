@@ -0,0 +1,542 @@
+"""Offline benchmark suite for the verifier bot
+
+Generates synthetic BestInSlot snapshots, user/address registries and a fake
+guild, mocks the HTTP layer, and measures the real code paths:
+
+- snapshot parsing (1k to 1M wallets)
+- single ownership checks against a warm cache
+- full Verify flows (interaction in, roles and reply out)
+- full role sweeps over every registered user
+
+Results are printed and saved as JSON so runs can be compared:
+
+    python benchmark.py                          # default sizes
+    python benchmark.py --sizes 1000 1000000     # custom snapshot sizes
+    python benchmark.py --compare bench_results/old.json
+"""
+import os
+import sys
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_DIR = Path(__file__).resolve().parent
+START_DIR = Path.cwd()
+
+# The bot keeps its data, database and log relative to the working directory,
+# so run it in a scratch directory with quiet logging and no rate limiting.
+os.chdir(tempfile.mkdtemp(prefix='verifier-bench-'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('BESTINSLOT_RATE_LIMIT_QPM', '1000000')
+os.environ.setdefault('BESTINSLOT_RATE_LIMIT_BURST', '1000')
+os.environ.setdefault('MAGICEDEN_RATE_LIMIT_QPM', '1000000')
+os.environ.setdefault('MAGICEDEN_RATE_LIMIT_BURST', '1000')
+sys.path.insert(0, str(REPO_DIR))
+
+import discord
+import verifier_bot as vb
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CHUNK_SIZE = 64 * 1024
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def make_wallet(rng: random.Random) -> str:
+    """A taproot-looking address"""
+    return 'bc1p' + ''.join(rng.choice('023456789acdefghjklmnpqrstuvwxyz') for _ in range(58))
+
+def make_inscription(rng: random.Random) -> str:
+    return f'{rng.getrandbits(256):064x}i{rng.randrange(4)}'
+
+def make_snapshot_csv(wallets: List[str], rng: random.Random) -> bytes:
+    """Render a BestInSlot-style snapshot CSV for the given holders"""
+    lines = ['wallet,inscriptions_count,inscriptions']
+    for wallet in wallets:
+        count = min(1 + int(rng.expovariate(0.7)), 50)
+        inscriptions = ','.join(make_inscription(rng) for _ in range(count))
+        lines.append(f'{wallet},{count},"{inscriptions}"')
+    return ('\n'.join(lines) + '\n').encode()
+
+def chunks(data: bytes, size: int = CHUNK_SIZE):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of a list of latencies, in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'p50_ms': round(pick(0.50), 4),
+        'p95_ms': round(pick(0.95), 4),
+        'p99_ms': round(pick(0.99), 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+def measure_peak(func) -> int:
+    """Peak bytes allocated by Python while running func"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# ---------------------------------------------------------------------------
+# Mocked HTTP layer
+# ---------------------------------------------------------------------------
+
+class FakeContent:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def iter_chunked(self, size: int):
+        for chunk in chunks(self._body, size):
+            yield chunk
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.headers = headers or {}
+        self.content = FakeContent(body)
+        self._body = body
+
+    async def text(self) -> str:
+        return self._body.decode()
+
+    async def json(self, content_type=None):
+        return json.loads(self._body)
+
+    def release(self):
+        pass
+
+class FakeSession:
+    """Stands in for the aiohttp session, serving snapshots and bios from memory"""
+
+    def __init__(self, snapshots: Dict[str, bytes], bios: Optional[Dict[str, str]] = None):
+        self.snapshots = snapshots
+        self.bios = bios or {}
+        self.requests = 0
+
+    async def get(self, url: str, params=None, headers=None):
+        self.requests += 1
+        if url == vb.BESTINSLOT_API:
+            body = self.snapshots.get(params['slug'])
+            if body is None:
+                return FakeResponse(404, b'unknown collection')
+            return FakeResponse(200, body)
+        address = url[len(vb.MAGICEDEN_API):]
+        return FakeResponse(200, json.dumps({'bio': self.bios.get(address, '')}).encode())
+
+def install_session(session: FakeSession):
+    vb.get_http_session = lambda: session
+
+# ---------------------------------------------------------------------------
+# Fake Discord layer
+# ---------------------------------------------------------------------------
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str, default: bool = False):
+        self.id = role_id
+        self.name = name
+        self.position = role_id
+        self._default = default
+
+    def is_default(self) -> bool:
+        return self._default
+
+    def __repr__(self):
+        return f'<FakeRole {self.name}>'
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: 'FakeGuild', edit_latency: float):
+        self.id = member_id
+        self.name = f'user{member_id}'
+        self.guild = guild
+        self.roles = [guild.default_role]
+        self.edits = 0
+        self._edit_latency = edit_latency
+
+    async def edit(self, roles, reason=None):
+        if self._edit_latency:
+            await asyncio.sleep(self._edit_latency)
+        else:
+            await asyncio.sleep(0)
+        self.edits += 1
+        self.roles = [self.guild.default_role] + list(roles)
+        return self
+
+class FakeGuild:
+    def __init__(self, guild_id: int, role_names: List[str]):
+        self.id = guild_id
+        self.name = 'Benchmark Guild'
+        self.default_role = FakeRole(guild_id, '@everyone', default=True)
+        self.roles = [self.default_role] + [FakeRole(guild_id + i + 1, name) for i, name in enumerate(role_names)]
+        self.chunked = True
+        self._members: Dict[int, FakeMember] = {}
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    def add_member(self, member: FakeMember):
+        self._members[member.id] = member
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def fetch_member(self, member_id: int) -> FakeMember:
+        return self._members[member_id]
+
+    async def chunk(self, cache=True):
+        return self.members
+
+class FakeInteractionResponse:
+    def __init__(self):
+        self._done = False
+        self.messages = []
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.messages.append(content)
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+class FakeMessage:
+    def __init__(self, followup: 'FakeFollowup'):
+        self._followup = followup
+
+    async def edit(self, content=None, **kwargs):
+        self._followup.messages.append(content)
+        return self
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, wait=False, **kwargs):
+        self.messages.append(content)
+        return FakeMessage(self) if wait else None
+
+class FakeInteraction:
+    def __init__(self, guild: FakeGuild, member: FakeMember):
+        self.guild = guild
+        self.user = member
+        self.response = FakeInteractionResponse()
+        self.followup = FakeFollowup()
+        self.created_at = discord.utils.utcnow()
+        self.data = {}
+        self.extras = {}
+
+    async def edit_original_response(self, content=None, **kwargs):
+        self.response.messages.append(content)
+
+# ---------------------------------------------------------------------------
+# Scenario setup
+# ---------------------------------------------------------------------------
+
+class Scenario:
+    """Synthetic collections, registered users and a guild that mirrors them"""
+
+    def __init__(self, holders_per_collection: int, users: int, addresses_per_user: int,
+                 holder_ratio: float, edit_latency: float, seed: int):
+        rng = random.Random(seed)
+        self.slugs = list(vb.COLLECTIONS)
+        self.guild = FakeGuild(10_000, list(vb.COLLECTIONS.values()))
+        vb.guild_collections.seed(self.guild.id, vb.COLLECTIONS)
+
+        # Registered addresses; a share of them hold something in each collection
+        user_addresses = {
+            str(100_000 + i): [make_wallet(rng) for _ in range(addresses_per_user)]
+            for i in range(users)
+        }
+        registered = [address for addresses in user_addresses.values() for address in addresses]
+
+        self.snapshots = {}
+        for slug in self.slugs:
+            holders = [address for address in registered if rng.random() < holder_ratio]
+            holders += [make_wallet(rng) for _ in range(max(0, holders_per_collection - len(holders)))]
+            rng.shuffle(holders)
+            self.snapshots[slug] = make_snapshot_csv(holders, rng)
+
+        with vb.store.transaction() as conn:
+            conn.execute('DELETE FROM user_addresses')
+            conn.executemany(
+                'INSERT INTO user_addresses VALUES (?, ?, ?, ?)',
+                [
+                    (user_id, address, vb.normalize_address(address), time.time())
+                    for user_id, addresses in user_addresses.items()
+                    for address in addresses
+                ]
+            )
+        vb.address_registry = vb.AddressRegistry(vb.store)
+        self.user_ids = list(user_addresses)
+
+        for user_id in self.user_ids:
+            self.guild.add_member(FakeMember(int(user_id), self.guild, edit_latency))
+
+        self.session = FakeSession(self.snapshots)
+        install_session(self.session)
+        vb.snapshot_cache = vb.SnapshotCache(vb.SNAPSHOT_TTL)
+
+    async def warm(self):
+        for slug in self.slugs:
+            await vb.snapshot_cache.get(slug)
+
+    def reset_roles(self):
+        for member in self.guild.members:
+            member.roles = [self.guild.default_role]
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_parse(size: int, seed: int) -> dict:
+    """Streaming snapshot parse throughput and peak memory"""
+    rng = random.Random(seed)
+    body = make_snapshot_csv([make_wallet(rng) for _ in range(size)], rng)
+
+    def parse():
+        parser = vb.SnapshotParser()
+        for chunk in chunks(body):
+            parser.feed(chunk)
+        return parser.close()
+
+    runs = 3 if size <= 100_000 else 1
+    timings = []
+    for _ in range(runs):
+        gc.collect()
+        started = time.perf_counter()
+        holders = parse()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    peak = measure_peak(parse)
+    return {
+        'name': 'snapshot_parse',
+        'wallets': size,
+        'payload_bytes': len(body),
+        'holders': len(holders),
+        'seconds': round(best, 4),
+        'rows_per_second': round(size / best),
+        'mb_per_second': round(len(body) / best / 1e6, 2),
+        'peak_memory_bytes': peak,
+    }
+
+async def bench_ownership(scenario: Scenario, checks: int, seed: int) -> dict:
+    """Latency of verify_ownership against a warm snapshot cache"""
+    rng = random.Random(seed)
+    await scenario.warm()
+    addresses = [address for user_id in scenario.user_ids for address in vb.address_registry.get(user_id)]
+    samples = []
+    started = time.perf_counter()
+    for _ in range(checks):
+        address = rng.choice(addresses)
+        slug = rng.choice(scenario.slugs)
+        check_started = time.perf_counter()
+        await vb.verify_ownership(address, slug)
+        samples.append(time.perf_counter() - check_started)
+    total = time.perf_counter() - started
+    return {
+        'name': 'ownership_check',
+        'checks': checks,
+        'checks_per_second': round(checks / total),
+        **percentiles(samples),
+    }
+
+async def bench_verify_flow(scenario: Scenario, flows: int, concurrency: int, seed: int) -> dict:
+    """Full Verify button flows: time to the first answer, and to the refreshed roles and reply"""
+    rng = random.Random(seed)
+    await scenario.warm()
+    scenario.reset_roles()
+    samples = []
+    refresh_samples = []
+
+    async def one_flow():
+        member = scenario.guild.get_member(int(rng.choice(scenario.user_ids)))
+        interaction = FakeInteraction(scenario.guild, member)
+        started = time.perf_counter()
+        await interaction.response.defer(ephemeral=True)
+        await vb.verify._callback(interaction)
+        samples.append(time.perf_counter() - started)
+        refresh = interaction.extras.get('verification_refresh')
+        if refresh is not None:
+            await refresh
+        refresh_samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for batch_start in range(0, flows, concurrency):
+        await asyncio.gather(*(one_flow() for _ in range(min(concurrency, flows - batch_start))))
+    total = time.perf_counter() - started
+    return {
+        'name': 'verify_flow',
+        'flows': flows,
+        'concurrency': concurrency,
+        'flows_per_second': round(flows / total, 1),
+        **percentiles(samples),
+        **{f'refreshed_{key}': value for key, value in percentiles(refresh_samples).items()},
+    }
+
+async def bench_sweep(scenario: Scenario, cold: bool) -> dict:
+    """A full role sweep over every registered user"""
+    if cold:
+        vb.snapshot_cache = vb.SnapshotCache(vb.SNAPSHOT_TTL)
+    else:
+        await scenario.warm()
+    scenario.reset_roles()
+    requests_before = scenario.session.requests
+
+    async def sweep():
+        if cold:
+            await scenario.warm()
+        return await vb.sweep_engine.run(scenario.guild, scenario.user_ids)
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    summary = await sweep()
+    duration = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'name': 'sweep_cold' if cold else 'sweep_warm',
+        'users': summary.users_total,
+        'members_changed': summary.members_changed,
+        'roles_added': summary.roles_added,
+        'errors': summary.errors,
+        'upstream_requests': scenario.session.requests - requests_before,
+        'seconds': round(duration, 4),
+        'users_per_second': round(summary.users_total / duration, 1),
+        'peak_memory_bytes': peak,
+    }
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def result_key(result: dict) -> str:
+    params = [f"{key}={result[key]}" for key in ('wallets', 'users', 'flows', 'checks') if key in result]
+    return ' '.join([result['name']] + params)
+
+def print_result(result: dict):
+    details = ', '.join(f'{key}={value}' for key, value in result.items() if key != 'name')
+    print(f'{result["name"]:<16} {details}')
+
+def print_comparison(results: List[dict], baseline_path: Path):
+    """Show how throughput and latency moved relative to an earlier run"""
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+    print(f'\nCompared with {baseline_path}:')
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        changes = []
+        for key, value in result.items():
+            if key.endswith(('_per_second', '_ms', 'seconds', '_bytes')) and isinstance(old.get(key), (int, float)) and old[key]:
+                changes.append(f'{key} {(value - old[key]) / old[key]:+.1%}')
+        print(f'  {result_key(result)}: {", ".join(changes)}')
+
+async def run_async_benchmarks(args) -> List[dict]:
+    results = []
+    scenario = Scenario(
+        holders_per_collection=args.holders, users=args.users,
+        addresses_per_user=args.addresses_per_user, holder_ratio=args.holder_ratio,
+        edit_latency=args.edit_latency, seed=args.seed
+    )
+    vb.sweep_engine = vb.SweepEngine(args.sweep_concurrency)
+    for benchmark in (
+        bench_ownership(scenario, args.checks, args.seed),
+        bench_verify_flow(scenario, args.flows, args.verify_concurrency, args.seed),
+        bench_sweep(scenario, cold=True),
+        bench_sweep(scenario, cold=False),
+    ):
+        result = await benchmark
+        print_result(result)
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the verifier bot')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='snapshot sizes (wallets) for the parse benchmark')
+    parser.add_argument('--holders', type=int, default=100_000, help='wallets per collection snapshot')
+    parser.add_argument('--users', type=int, default=20_000, help='registered users')
+    parser.add_argument('--addresses-per-user', type=int, default=2)
+    parser.add_argument('--holder-ratio', type=float, default=0.3,
+                        help='share of registered addresses holding each collection')
+    parser.add_argument('--checks', type=int, default=100_000, help='ownership checks to time')
+    parser.add_argument('--flows', type=int, default=2_000, help='Verify flows to time')
+    parser.add_argument('--verify-concurrency', type=int, default=50)
+    parser.add_argument('--sweep-concurrency', type=int, default=vb.SWEEP_CONCURRENCY)
+    parser.add_argument('--edit-latency', type=float, default=0.0,
+                        help='simulated seconds per Discord member edit')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', type=Path, help='where to write the JSON results')
+    parser.add_argument('--compare', type=Path, help='earlier results JSON to compare against')
+    args = parser.parse_args()
+    if args.output:
+        args.output = START_DIR / args.output
+    if args.compare:
+        args.compare = START_DIR / args.compare
+
+    results = []
+    for size in args.sizes:
+        result = bench_parse(size, args.seed)
+        print_result(result)
+        results.append(result)
+    results.extend(asyncio.run(run_async_benchmarks(args)))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        },
+        'results': results,
+    }
+    output = args.output or REPO_DIR / 'bench_results' / f'{time.strftime("%Y%m%d-%H%M%S")}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nSaved results to {output}')
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == '__main__':
+    main()
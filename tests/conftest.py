@@ -0,0 +1,19 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+@pytest.fixture(scope='session')
+def vb(tmp_path_factory):
+    """The bot module, imported inside a scratch directory so its data files stay out of the repo"""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('bot'))
+    try:
+        yield importlib.import_module('verifier_bot')
+    finally:
+        os.chdir(previous)
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+class FakeResponse:
+    def __init__(self, log):
+        self.log = log
+        self.deferred = False
+
+    def is_done(self):
+        return self.deferred
+
+    async def defer(self, **kwargs):
+        self.log.append('defer')
+        self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.log.append('send_message')
+
+class FakeFollowup:
+    def __init__(self, log):
+        self.log = log
+
+    async def send(self, content=None, **kwargs):
+        self.log.append(('followup', content))
+
+def test_add_address_modal_defers_before_the_bio_check(vb, monkeypatch):
+    log = []
+
+    async def slow_bio_check(address, user_id):
+        log.append('bio')
+        await asyncio.sleep(0.01)
+        return False
+
+    monkeypatch.setattr(vb, 'verify_me_bio', slow_bio_check)
+    interaction = SimpleNamespace(
+        user=SimpleNamespace(id=717171), data={}, created_at=discord.utils.utcnow(),
+        response=FakeResponse(log), followup=FakeFollowup(log))
+
+    asyncio.run(vb.AddAddressModal.on_submit(SimpleNamespace(address='bc1qmodal'), interaction))
+
+    assert log[:2] == ['defer', 'bio']
+    assert log[2][0] == 'followup' and 'verification code' in log[2][1]
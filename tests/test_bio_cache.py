@@ -0,0 +1,36 @@
+import asyncio
+
+def test_concurrent_submits_share_one_fetch(vb, monkeypatch):
+    user_id = '424242'
+    address = 'bc1qconcurrentsubmits'
+    code = vb.get_user_verification_code(user_id)
+    calls = []
+
+    async def fake_fetch(fetched_address):
+        calls.append(fetched_address)
+        await asyncio.sleep(0.05)
+        return f'gm {code}'
+
+    monkeypatch.setattr(vb, '_fetch_me_bio', fake_fetch)
+
+    async def submit_twice():
+        return await asyncio.gather(vb.verify_me_bio(address, user_id), vb.verify_me_bio(address, user_id))
+
+    assert asyncio.run(submit_twice()) == [True, True]
+    assert len(calls) == 1
+
+def test_failed_fetch_within_floor_counts_as_miss(vb, monkeypatch):
+    cache = vb.BioCache(positive_ttl=600, negative_ttl=20, refresh_floor=60, max_entries=100)
+
+    async def failing_fetch(fetched_address):
+        return None
+
+    monkeypatch.setattr(vb, '_fetch_me_bio', failing_fetch)
+
+    async def get_twice():
+        first = await cache.get('bc1qfailingfetch', 'CODE')
+        second = await cache.get('bc1qfailingfetch', 'CODE')
+        return first, second
+
+    assert asyncio.run(get_twice()) == (None, None)
+    assert (cache.hits, cache.misses) == (0, 2)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+GUILD = 1
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class MidpointRandom:
+    """Always picks the middle of the range, so jitter and spreading are predictable"""
+
+    def uniform(self, low, high):
+        return (low + high) / 2
+
+@pytest.fixture
+def schedule(vb, tmp_path):
+    store = vb.Store(tmp_path / 'schedule.db')
+    clock = Clock()
+    yield vb.CheckSchedule(store, clock=clock, rng=MidpointRandom()), clock, store
+    store.close()
+
+def test_new_members_are_spread_over_the_first_interval(vb, schedule):
+    checks, clock, _ = schedule
+    asyncio.run(checks.ensure(GUILD, ['a', 'b']))
+    interval = vb.WALLET_CHECK_INTERVAL * 60
+
+    assert checks.due(GUILD, 10) == []
+    clock.now += interval / 2
+    assert sorted(checks.due(GUILD, 10)) == ['a', 'b']
+
+    # Members already scheduled keep their slot
+    asyncio.run(checks.ensure(GUILD, ['a', 'c']))
+    assert sorted(checks.due(GUILD, 10)) == ['a', 'b']
+
+def test_due_is_most_overdue_first_and_limited(vb, schedule):
+    checks, clock, _ = schedule
+    asyncio.run(checks.expedite(GUILD, ['late']))
+    clock.now += 10
+    asyncio.run(checks.expedite(GUILD, ['later']))
+    clock.now += 10
+    asyncio.run(checks.expedite(GUILD, ['latest']))
+
+    assert checks.due(GUILD, 2) == ['late', 'later']
+    assert checks.due(GUILD, 10) == ['late', 'later', 'latest']
+
+def test_interval_grows_while_unchanged_and_resets_on_change(vb, schedule):
+    checks, clock, _ = schedule
+
+    def interval():
+        return checks._by_guild[GUILD]['a'][1]
+
+    asyncio.run(checks.record(GUILD, 'a', changed=False))
+    assert interval() == 2 * vb.WALLET_CHECK_INTERVAL * 60
+    for _ in range(20):
+        asyncio.run(checks.record(GUILD, 'a', changed=False))
+    assert interval() == vb.CHECK_INTERVAL_MAX * 60
+
+    asyncio.run(checks.record(GUILD, 'a', changed=True))
+    assert interval() == vb.CHECK_INTERVAL_MIN * 60
+    assert checks.due(GUILD, 10) == []
+    clock.now += vb.CHECK_INTERVAL_MIN * 60
+    assert checks.due(GUILD, 10) == ['a']
+
+def test_active_collections_cap_the_interval(vb, schedule):
+    checks, _, _ = schedule
+    checks.note_refresh('pixelpepes', changed_wallets=50, holders=100)
+    for _ in range(10):
+        asyncio.run(checks.record(GUILD, 'a', changed=False, held_slugs=['pixelpepes']))
+    assert checks._by_guild[GUILD]['a'][1] == vb.WALLET_CHECK_INTERVAL * 60
+
+def test_expedite_makes_members_due_and_shortens_their_interval(vb, schedule):
+    checks, clock, store = schedule
+    for _ in range(5):
+        asyncio.run(checks.record(GUILD, 'a', changed=False))
+    assert checks.due(GUILD, 10) == []
+
+    asyncio.run(checks.expedite(GUILD, ['a']))
+    assert checks.due(GUILD, 10) == ['a']
+    assert checks._by_guild[GUILD]['a'][1] == vb.CHECK_INTERVAL_MIN * 60
+
+    # Spread over a window, a member becomes due by its end at the latest
+    asyncio.run(checks.record(GUILD, 'b', changed=False))
+    asyncio.run(checks.expedite(GUILD, ['b'], within=60))
+    assert 'b' not in checks.due(GUILD, 10)
+    clock.now += 60
+    assert 'b' in checks.due(GUILD, 10)
+
+    # Written through, so a restart picks up the same schedule
+    assert store.load_check_schedule()[GUILD]['a'] == checks._by_guild[GUILD]['a']
+
+def test_forget_and_dispatched(vb, schedule):
+    checks, clock, _ = schedule
+    asyncio.run(checks.expedite(GUILD, ['a', 'b']))
+    asyncio.run(checks.dispatched(GUILD, ['a']))
+    assert checks.due(GUILD, 10) == ['b']
+
+    asyncio.run(checks.forget(GUILD, ['b']))
+    assert checks.due(GUILD, 10) == []
+    assert checks.stats(GUILD) == (1, 0, vb.CHECK_INTERVAL_MIN * 60)
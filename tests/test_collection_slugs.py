@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+def test_slug_validation(vb):
+    assert vb.is_collection_slug('pixel-pepes2')
+    for slug in ('../x', 'a/b', 'Pixel', 'pepes.snapshot', '', 'a b'):
+        assert not vb.is_collection_slug(slug)
+
+def test_snapshot_paths_stay_in_the_directory(vb, tmp_path):
+    cache = vb.SnapshotCache(ttl=60, directory=tmp_path)
+    with pytest.raises(ValueError):
+        cache._path('../outside')
+
+def test_set_collection_rejects_path_slugs(vb, monkeypatch):
+    async def must_not_fetch(slug):
+        raise AssertionError('an invalid slug must not reach the snapshot cache')
+
+    monkeypatch.setattr(vb.snapshot_cache, 'get', must_not_fetch)
+    sent = []
+
+    async def send_message(content=None, **kwargs):
+        sent.append(content)
+
+    interaction = SimpleNamespace(guild=SimpleNamespace(id=929292), response=SimpleNamespace(send_message=send_message))
+    asyncio.run(vb.set_collection._callback(interaction, '../x', 'Evil'))
+
+    assert sent and sent[0].startswith('❌')
+    assert vb.guild_collections.get(929292) == {}
@@ -0,0 +1,13 @@
+import logging
+
+def make_record(vb, audit=False):
+    record = logging.LogRecord('test', logging.INFO, __file__, 42, 'Added role Holder to someone', None, None)
+    if audit:
+        record.__dict__.update(vb.AUDIT_LOG)
+    return record
+
+def test_role_changes_are_never_sampled(vb):
+    sampler = vb.LogSampler(limit=2, window=60)
+
+    assert [sampler.filter(make_record(vb)) for _ in range(4)] == [True, True, False, False]
+    assert all(sampler.filter(make_record(vb, audit=True)) for _ in range(50))
@@ -0,0 +1,43 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+class RestOnlyGuild:
+    """A guild as seen without the members intent: nothing cached, members only over REST"""
+
+    def __init__(self, member_count):
+        self.member_count = member_count
+        self.listings = 0
+        self.fetches = 0
+
+    def get_member(self, user_id):
+        return None
+
+    async def fetch_members(self, limit=None):
+        self.listings += 1
+        for user_id in range(self.member_count):
+            yield SimpleNamespace(id=user_id)
+
+    async def fetch_member(self, user_id):
+        self.fetches += 1
+        if user_id >= self.member_count:
+            raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown Member')
+        return SimpleNamespace(id=user_id)
+
+def test_without_members_intent_large_batches_list_members(vb, monkeypatch):
+    monkeypatch.setattr(vb, 'MEMBERS_INTENT', False)
+    guild = RestOnlyGuild(member_count=2500)  # three pages
+
+    members = asyncio.run(vb.sweep_members(guild, [str(user_id) for user_id in range(10)] + ['99999']))
+    assert sorted(members) == list(range(10))
+    assert (guild.listings, guild.fetches) == (1, 0)
+    assert asyncio.run(vb.member_ids(guild)) is None
+
+def test_without_members_intent_small_batches_fetch_each(vb, monkeypatch):
+    monkeypatch.setattr(vb, 'MEMBERS_INTENT', False)
+    guild = RestOnlyGuild(member_count=2500)
+
+    members = asyncio.run(vb.sweep_members(guild, ['1', '99999']))
+    assert sorted(members) == [1]
+    assert (guild.listings, guild.fetches) == (0, 2)
@@ -0,0 +1,40 @@
+import json
+import shutil
+
+LEGACY_ADDRESSES = {
+    '111': ['bc1qfirst', 'BC1QSecond'],
+    '222': ['bc1qthird'],
+}
+LEGACY_CODES = {'111': 'ABCD2345', '222': 'WXYZ6789'}
+
+def test_legacy_json_is_migrated_once(vb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    (tmp_path / vb.USER_DATA_FILE).write_text(json.dumps(LEGACY_ADDRESSES))
+    (tmp_path / vb.VERIFICATION_CODES_FILE).write_text(json.dumps(LEGACY_CODES))
+    store = vb.Store(tmp_path / 'data' / 'verifier.db')
+    try:
+        store.migrate_json()
+        assert store.load_addresses() == LEGACY_ADDRESSES
+        assert store.load_verification_codes() == LEGACY_CODES
+        assert not (tmp_path / vb.USER_DATA_FILE).exists()
+        assert (tmp_path / f'{vb.USER_DATA_FILE}.migrated').exists()
+
+        # Collections were never kept in JSON; the hard-coded defaults seed the home guild
+        collections = vb.GuildCollections(store)
+        collections.seed(1234, vb.COLLECTIONS)
+        assert vb.GuildCollections(store).get(1234) == vb.COLLECTIONS
+
+        # A second run finds nothing to import
+        store.migrate_json()
+        assert store.load_addresses() == LEGACY_ADDRESSES
+        assert store.load_verification_codes() == LEGACY_CODES
+
+        # Even a restored legacy file doesn't duplicate anything
+        shutil.copy(tmp_path / f'{vb.USER_DATA_FILE}.migrated', tmp_path / vb.USER_DATA_FILE)
+        store.migrate_json()
+        assert store.load_addresses() == LEGACY_ADDRESSES
+        collections.seed(1234, {'other': 'Other Holder'})
+        assert vb.GuildCollections(store).get(1234) == vb.COLLECTIONS
+    finally:
+        store.close()
@@ -0,0 +1,35 @@
+import asyncio
+
+def test_background_gets_its_minimum_share(vb):
+    async def scenario():
+        waiters = vb.PriorityWaiters('test', min_background_share=0.25)
+        interactive = [waiters.add(vb.PRIORITY_INTERACTIVE) for _ in range(20)]
+        background = [waiters.add(vb.PRIORITY_BACKGROUND) for _ in range(20)]
+        grants = [waiters.pop() for _ in range(20)]
+        return sum(future in background for future in grants), sum(future in interactive for future in grants)
+
+    background_grants, interactive_grants = asyncio.run(scenario())
+    assert background_grants >= 5
+    assert interactive_grants > background_grants
+
+def test_request_priority_orders_token_bucket_grants(vb):
+    bucket = vb.TokenBucket('test', rate_per_minute=6000, burst=1, min_background_share=vb.BACKGROUND_MIN_SHARE)
+    order = []
+
+    async def caller(priority, name):
+        vb.request_priority.set(priority)  # each task runs in its own context
+        await bucket.acquire()
+        order.append(name)
+
+    async def scenario():
+        await bucket.acquire()  # empties the bucket so everyone queues
+        tasks = [asyncio.create_task(caller(vb.PRIORITY_BACKGROUND, f'b{i}')) for i in range(10)]
+        tasks += [asyncio.create_task(caller(vb.PRIORITY_INTERACTIVE, f'i{i}')) for i in range(10)]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    first_half = order[:10]
+    # Interactive callers go first despite queueing last, but background still gets its share meanwhile
+    assert sum(name.startswith('i') for name in first_half) >= 7
+    assert sum(name.startswith('b') for name in first_half) >= int(10 * vb.BACKGROUND_MIN_SHARE)
+    assert vb.request_priority.get() == vb.PRIORITY_INTERACTIVE
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+def rate_limited(vb, scope):
+    return dict(vb.DISCORD_RATE_LIMITED._values).get((('scope', scope),), 0)
+
+def test_global_429_counted_once(vb):
+    log = logging.getLogger('discord.http')
+    before = {scope: rate_limited(vb, scope) for scope in ('route', 'global')}
+
+    async def hit_429s():
+        log.warning('We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.', 'PUT', '/roles', 1.0)
+        await asyncio.sleep(0)
+        log.warning('We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.', 'PUT', '/roles', 1.0)
+        log.warning('Global rate limit has been hit. Retrying in %.2f seconds.', 1.0)
+        await asyncio.sleep(0)
+
+    asyncio.run(hit_429s())
+    assert rate_limited(vb, 'route') - before['route'] == 1
+    assert rate_limited(vb, 'global') - before['global'] == 1
+
+def test_429s_counted_when_log_level_hides_warnings(vb, monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, 'level', logging.ERROR)
+    log = logging.getLogger('discord.http')
+    before = rate_limited(vb, 'route')
+    emitted = []
+    handler = logging.Handler()
+    handler.emit = emitted.append
+    root.addHandler(handler)
+    try:
+        async def hit_429():
+            log.warning('We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds.', 'PUT', '/roles', 1.0)
+            await asyncio.sleep(0)
+
+        asyncio.run(hit_429())
+    finally:
+        root.removeHandler(handler)
+    assert rate_limited(vb, 'route') - before == 1
+    assert emitted == []
+    assert log.getEffectiveLevel() <= logging.WARNING
@@ -0,0 +1,30 @@
+import asyncio
+
+def test_tiers_count_across_all_wallets(vb, monkeypatch):
+    held = {'bc1qfirstwallet': (3, 'a1i0,a2i0,a3i0'), 'bc1qsecondwallet': (3, 'b1i0,b2i0,b3i0')}
+
+    async def verify_ownership(address, slug):
+        count, inscriptions = held[address]
+        return True, count, inscriptions
+
+    monkeypatch.setattr(vb, 'verify_ownership', verify_ownership)
+    addresses = list(held)
+    holdings = asyncio.run(vb.collect_holdings(addresses, ['pixelpepes']))
+    assert holdings['pixelpepes'][0] == 6
+
+    managed = vb.ManagedRoles({}, [(vb.RoleRule('Whale', 'pixelpepes', 5), 'whale')])
+    assert managed.evaluate(addresses, holdings) == {'whale'}
+
+def test_inscription_rules_ignore_case(vb):
+    upstream = 'ABCDEF0123i0'
+    snapshot = vb.CollectionSnapshot('pixelpepes', {'bc1qholder': (1, upstream)}, 0)
+    rule = vb.RoleRule('Rare', 'pixelpepes', 1, ['abcdef0123I0'])
+    assert rule.matches(snapshot, {'bc1qholder'}, 1)
+    assert snapshot.owner_of('abcdef0123i0') == 'bc1qholder'
+
+    # Same through the streaming parser's prebuilt owner index
+    parser = vb.SnapshotParser(index_inscriptions=True)
+    parser.feed(f'wallet,inscriptions_count,inscriptions\nbc1qholder,1,{upstream}\n'.encode())
+    parsed = vb.CollectionSnapshot('pixelpepes', parser.close(), 0, owners=parser.owners)
+    assert vb.RoleRule('Rare', 'pixelpepes', 1, [upstream]).matches(parsed, {'bc1qholder'}, 1)
+    assert rule.matches(parsed, {'bc1qholder'}, 1)
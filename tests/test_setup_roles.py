@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+class FakeGuild:
+    def __init__(self, guild_id, role_names):
+        self.id = guild_id
+        self.roles = [SimpleNamespace(name=name) for name in role_names]
+        self.created = []
+
+    async def create_role(self, name, **kwargs):
+        self.created.append(name)
+        self.roles.append(SimpleNamespace(name=name))
+
+def test_setup_and_check_roles(vb):
+    guild = FakeGuild(919191, ['Pixel Pepe Holder'])
+    asyncio.run(vb.guild_collections.set(guild.id, 'pixelpepes', 'Pixel Pepe Holder'))
+    asyncio.run(vb.guild_collections.set(guild.id, 'space-pepes', 'Space Pepe Holder'))
+
+    setup = SimpleNamespace(guild=guild, response=FakeResponse())
+    asyncio.run(vb.setup_roles._callback(setup))
+    assert guild.created == ['Space Pepe Holder']
+    assert 'Created roles: Space Pepe Holder' in setup.response.messages[0]
+
+    member = SimpleNamespace(roles=[SimpleNamespace(name='Space Pepe Holder')])
+    check = SimpleNamespace(guild=guild, user=member, response=FakeResponse())
+    asyncio.run(vb.check_roles._callback(check))
+    assert '• Space Pepe Holder' in check.response.messages[0]
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+HOLDERS = {
+    'bc1qalpha': (2, 'i1,i2'),
+    'bc1qbeta': (1, 'i3'),
+    'bc1qzulu': (5, 'i4,i5,i6,i7,i8'),
+    'bc1qünïcode': (1, 'i9'),
+}
+
+def write(vb, path, holders=HOLDERS, slug='pixelpepes'):
+    snapshot = vb.CollectionSnapshot(slug, holders, time.time() - 30, content_hash='ab' * 16,
+                                     etag='"v1"', last_modified='Sat, 17 Oct 2026 10:00:00 GMT')
+    vb.write_snapshot_file(path, snapshot)
+    return snapshot
+
+def test_round_trip(vb, tmp_path):
+    path = tmp_path / 'pixelpepes.snapshot'
+    original = write(vb, path)
+
+    restored = vb.open_snapshot_file(path, 'pixelpepes')
+    assert isinstance(restored.holders, vb.MappedHolders)
+    assert len(restored.holders) == len(HOLDERS)
+    for wallet, holding in HOLDERS.items():
+        assert restored.holders[wallet] == holding
+        assert restored.lookup(wallet) == holding
+    assert 'bc1qmissing' not in restored.holders
+    assert 'bc1qa' not in restored.holders
+    assert restored.lookup('bc1qmissing') is None
+    assert dict(restored.holders.iter_items()) == HOLDERS
+    assert restored.fetched_at == original.fetched_at
+    assert (restored.content_hash, restored.etag, restored.last_modified) == (
+        original.content_hash, original.etag, original.last_modified)
+
+def test_empty_snapshot_round_trip(vb, tmp_path):
+    path = tmp_path / 'empty.snapshot'
+    write(vb, path, holders={}, slug='empty')
+    restored = vb.open_snapshot_file(path, 'empty')
+    assert len(restored.holders) == 0
+    assert restored.lookup('bc1qalpha') is None
+
+def test_other_collection_is_rejected(vb, tmp_path):
+    path = tmp_path / 'pixelpepes.snapshot'
+    write(vb, path)
+    assert vb.open_snapshot_file(path, 'space-pepes') is None
+
+@pytest.mark.parametrize('keep', [0, 10, 60, -1, -5])
+def test_truncated_file_is_rejected(vb, tmp_path, keep):
+    path = tmp_path / 'pixelpepes.snapshot'
+    write(vb, path)
+    data = path.read_bytes()
+    path.write_bytes(data[:keep] if keep >= 0 else data[:len(data) + keep])
+    assert vb.open_snapshot_file(path, 'pixelpepes') is None
+
+def test_corrupt_header_is_rejected(vb, tmp_path):
+    path = tmp_path / 'pixelpepes.snapshot'
+    write(vb, path)
+    data = bytearray(path.read_bytes())
+    data[:4] = b'JUNK'
+    path.write_bytes(bytes(data))
+    assert vb.open_snapshot_file(path, 'pixelpepes') is None
+
+def test_inconsistent_holder_count_is_rejected(vb, tmp_path):
+    path = tmp_path / 'pixelpepes.snapshot'
+    write(vb, path)
+    data = bytearray(path.read_bytes())
+    count_offset = 4 + 2 + 8  # magic, version, fetched_at
+    data[count_offset] += 1
+    path.write_bytes(bytes(data))
+    assert vb.open_snapshot_file(path, 'pixelpepes') is None
@@ -0,0 +1,21 @@
+import asyncio
+import time
+
+import pytest
+
+def test_follower_serves_stale_snapshot_without_fetching(vb, tmp_path, monkeypatch):
+    async def no_upstream(slug, previous):
+        raise AssertionError('a follower must not fetch upstream')
+
+    monkeypatch.setattr(vb, 'fetch_collection_snapshot', no_upstream)
+    stale = vb.CollectionSnapshot('pixelpepes', {'bc1qholder': (2, 'a,b')}, time.time() - 3600)
+    vb.write_snapshot_file(tmp_path / 'pixelpepes.snapshot', stale)
+    follower = vb.SnapshotCache(ttl=60, directory=tmp_path, follower=True)
+
+    snapshot = asyncio.run(follower.get('pixelpepes'))
+    assert snapshot.lookup('bc1qholder') == (2, 'a,b')
+    assert snapshot.age >= 3600
+
+    # Without anything from the bot the job fails and is retried rather than stripping roles
+    with pytest.raises(RuntimeError):
+        asyncio.run(follower.get('space-pepes'))
@@ -0,0 +1,50 @@
+import csv
+import io
+
+import pytest
+
+SNAPSHOT = (
+    'wallet,inscriptions_count,inscriptions\r\n'
+    'BC1QALPHA,2,"i1,i2"\r\n'
+    'bc1qbeta,1,"multi\nline"\r\n'
+    'bc1qgamma,3,"crlf\r\ninside,i9"\r\n'
+    'bc1qdelta,1,i5\r\n'
+    'bc1qlast,1,i6'
+).encode()
+
+def reference_holders(data: bytes):
+    rows = csv.DictReader(io.StringIO(data.decode(), newline=''))
+    return {row['wallet'].strip().lower(): (int(row['inscriptions_count']), row['inscriptions'].strip()) for row in rows}
+
+def parse_in_chunks(vb, data: bytes, size: int):
+    parser = vb.SnapshotParser(index_inscriptions=True)
+    for start in range(0, len(data), size):
+        parser.feed(data[start:start + size])
+    return parser, parser.close()
+
+@pytest.mark.parametrize('size', range(1, 40))
+def test_rows_split_across_chunks(vb, size):
+    parser, holders = parse_in_chunks(vb, SNAPSHOT, size)
+
+    assert holders == reference_holders(SNAPSHOT)
+    assert holders['bc1qalpha'] == (2, 'i1,i2')
+    assert holders['bc1qbeta'] == (1, 'multi\nline')
+    assert holders['bc1qgamma'][0] == 3
+    assert holders['bc1qlast'] == (1, 'i6')
+    assert parser.skipped == 0
+    assert parser.owners['i2'] == 'bc1qalpha'
+    assert parser.count_buckets == {1: 3, 2: 1, 3: 1}
+
+def test_chunking_does_not_change_the_content_hash(vb):
+    whole, _ = parse_in_chunks(vb, SNAPSHOT, len(SNAPSHOT))
+    split, _ = parse_in_chunks(vb, SNAPSHOT, 7)
+    assert whole.content_hash == split.content_hash
+
+def test_unterminated_quote_is_skipped(vb):
+    _, holders = parse_in_chunks(vb, b'wallet,inscriptions_count,inscriptions\nbc1qok,1,i1\nbc1qbad,1,"open', 5)
+    assert holders == {'bc1qok': (1, 'i1')}
+
+def test_missing_header_is_rejected(vb):
+    parser = vb.SnapshotParser()
+    with pytest.raises(ValueError):
+        parser.close()
@@ -0,0 +1,23 @@
+import asyncio
+import threading
+
+def test_interactive_writes_run_off_the_event_loop(vb, monkeypatch):
+    loop_thread = threading.get_ident()
+    writers = []
+    add_address = vb.store.add_address
+
+    def recording_add(user_id, address):
+        writers.append(threading.get_ident())
+        return add_address(user_id, address)
+
+    monkeypatch.setattr(vb.store, 'add_address', recording_add)
+
+    async def register():
+        added = await vb.address_registry.add('818181', 'bc1qoffloop')
+        again = await vb.address_registry.add('818181', 'bc1qoffloop')
+        removed = await vb.address_registry.remove('818181', 'bc1qoffloop')
+        return added, again, removed
+
+    assert asyncio.run(register()) == (True, False, True)
+    assert writers and loop_thread not in writers
+    assert vb.address_registry.get('818181') == []
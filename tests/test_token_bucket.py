@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+def test_cancelled_waiter_does_not_use_a_token(vb):
+    bucket = vb.TokenBucket('test', rate_per_minute=600, burst=1)
+
+    async def scenario():
+        await bucket.acquire()  # empties the bucket
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.15)  # one token refills
+        return await bucket.acquire()
+
+    assert asyncio.run(scenario()) < 0.05
+
+def test_grant_to_a_cancelled_waiter_is_given_back(vb):
+    bucket = vb.TokenBucket('test', rate_per_minute=600, burst=2)
+
+    async def scenario():
+        await bucket.acquire()
+        await bucket.acquire()  # empties the bucket
+        bucket.penalize(0.2)  # both tokens come back at once, so both waiters are granted in one pass
+        second = None
+
+        async def first():
+            await bucket.acquire()
+            second.cancel()  # granted too, but hasn't resumed yet
+
+        first_task = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(bucket.acquire())
+        await first_task
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        # The second token is still in the bucket rather than lost with the cancelled waiter
+        return await bucket.acquire()
+
+    assert asyncio.run(scenario()) < 0.05
+
+def test_non_positive_rate_rejected(vb):
+    with pytest.raises(ValueError):
+        vb.TokenBucket('test', rate_per_minute=0, burst=1)
@@ -0,0 +1,32 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+def test_checked_without_holdings_has_a_check_time(vb):
+    vb.store.save_holdings('515151', {}, ['pixelpepes'])
+
+    holdings, checked_at = vb.store.load_holdings('515151', ['pixelpepes'])
+    assert holdings == {}
+    assert checked_at is not None
+
+    # A collection that was never checked for the user leaves the answer unknown
+    assert vb.store.load_holdings('515151', ['pixelpepes', 'space-pepes'])[1] is None
+
+def test_failed_refresh_replaces_the_cached_answer(vb, monkeypatch):
+    async def unavailable(addresses, slugs):
+        raise RuntimeError('BestInSlot is down')
+
+    monkeypatch.setattr(vb, 'collect_holdings', unavailable)
+    edits = []
+
+    async def edit(content=None):
+        edits.append(content)
+
+    interaction = SimpleNamespace(user=SimpleNamespace(id=616161), guild=SimpleNamespace(id=1))
+    managed = vb.ManagedRoles({}, [])
+    asyncio.run(vb.refresh_verification(interaction, edit, managed, ['bc1qrefresh'], '✅ cached', time.time() - 600))
+
+    assert len(edits) == 1
+    assert edits[0].startswith('✅ cached')
+    assert 'Checking again failed' in edits[0]
+    assert '10 min ago' in edits[0]
@@ -0,0 +1,57 @@
+import asyncio
+import sqlite3
+import time
+
+def test_failed_flush_is_retried_without_another_change(vb, tmp_path, monkeypatch):
+    store = vb.Store(tmp_path / 'codes.db')
+    registry = vb.VerificationCodeRegistry(store, flush_delay=0.01)
+    save = store.save_verification_codes
+    attempts = []
+
+    def flaky_save(codes):
+        attempts.append(dict(codes))
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        save(codes)
+
+    monkeypatch.setattr(store, 'save_verification_codes', flaky_save)
+
+    async def scenario():
+        code = registry.get('313131')
+        await asyncio.sleep(0.1)
+        return code
+
+    try:
+        code = asyncio.run(scenario())
+        assert len(attempts) == 2
+        assert store.load_verification_codes() == {'313131': code}
+        assert registry._pending == {}
+    finally:
+        store.close()
+
+def test_codes_added_during_a_write_are_flushed(vb, tmp_path, monkeypatch):
+    store = vb.Store(tmp_path / 'codes.db')
+    registry = vb.VerificationCodeRegistry(store, flush_delay=0.01)
+    save = store.save_verification_codes
+    writing = []
+
+    def slow_save(codes):
+        writing.append(True)
+        time.sleep(0.05)
+        save(codes)
+
+    monkeypatch.setattr(store, 'save_verification_codes', slow_save)
+
+    async def scenario():
+        first = registry.get('1')
+        while not writing:
+            await asyncio.sleep(0.001)
+        second = registry.get('2')  # queued while the first write runs in its thread
+        await asyncio.sleep(0.2)
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+        assert store.load_verification_codes() == {'1': first, '2': second}
+    finally:
+        store.close()
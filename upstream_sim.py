@@ -0,0 +1,462 @@
+"""Local stand-in for the BestInSlot and Magic Eden APIs, plus a load driver
+
+The simulator serves the two endpoints the bot calls:
+
+- GET /collection/snapshot?slug=...&type=csv  (BestInSlot snapshot CSV)
+- GET /v2/wallets/{address}                   (Magic Eden wallet profile)
+
+with configurable latency, payload size, bandwidth, 429/5xx injection, an
+upstream quota and snapshot mutation over time. Point the bot at it with:
+
+    python upstream_sim.py serve --port 8800 --wallets 50000 --throttle-rate 0.05
+    BESTINSLOT_API=http://127.0.0.1:8800/collection/snapshot \\
+    MAGICEDEN_API=http://127.0.0.1:8800/v2/wallets/ python verifier_bot.py
+
+The driver runs the bot's real Verify and Add Address code paths for N
+concurrent simulated users against a simulator (an embedded one unless
+--url is given) and reports latencies, upstream traffic and bot metrics:
+
+    python upstream_sim.py drive --users 500 --duration 120 --sweep-interval 30
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from email.utils import formatdate
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Deque, Dict, List, Optional
+
+from aiohttp import ClientSession, web
+
+REPO_DIR = Path(__file__).resolve().parent
+CHUNK_SIZE = 64 * 1024
+
+def sim_wallet(index: int) -> str:
+    """Deterministic taproot-length address for slot ``index`` of the wallet pool"""
+    return f'bc1psim{index:055d}'
+
+# ---------------------------------------------------------------------------
+# Simulated upstream state
+# ---------------------------------------------------------------------------
+
+class SimulatedCollection:
+    """Holders of one collection, mutated over time like a live marketplace"""
+
+    def __init__(self, slug: str, wallets: int, pool: int, mean_inscriptions: float, rng: random.Random):
+        self.slug = slug
+        self.pool = pool
+        self.rng = rng
+        self.holders: Dict[str, List[str]] = {}
+        for index in rng.sample(range(pool), min(wallets, pool)):
+            count = 1 + int(rng.expovariate(1 / max(mean_inscriptions - 1, 0.01)))
+            self.holders[sim_wallet(index)] = [self._inscription() for _ in range(min(count, 50))]
+        self.version = 0
+        self.modified_at = time.time()
+        self._body: Optional[bytes] = None
+
+    def _inscription(self) -> str:
+        return f'{self.rng.getrandbits(256):064x}i0'
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.slug}-{self.version}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.modified_at, usegmt=True)
+
+    def mutate(self, fraction: float) -> int:
+        """Transfer inscriptions between wallets; returns how many moved"""
+        moves = max(1, int(len(self.holders) * fraction)) if self.holders else 0
+        for _ in range(moves):
+            seller = self.rng.choice(list(self.holders))
+            inscriptions = self.holders[seller]
+            inscription = inscriptions.pop(self.rng.randrange(len(inscriptions)))
+            if not inscriptions:
+                del self.holders[seller]
+            buyer = sim_wallet(self.rng.randrange(self.pool))
+            self.holders.setdefault(buyer, []).append(inscription)
+        if moves:
+            self.version += 1
+            self.modified_at = time.time()
+            self._body = None
+        return moves
+
+    def body(self) -> bytes:
+        if self._body is None:
+            lines = ['wallet,inscriptions_count,inscriptions']
+            for wallet, inscriptions in self.holders.items():
+                lines.append(f'{wallet},{len(inscriptions)},"{",".join(inscriptions)}"')
+            self._body = ('\n'.join(lines) + '\n').encode()
+        return self._body
+
+class QuotaWindow:
+    """Sliding one-minute request quota, like the real APIs enforce"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.requests: Deque[float] = deque()
+
+    def retry_after(self) -> Optional[float]:
+        """None if the request fits in the quota, else seconds until it would"""
+        if not self.per_minute:
+            return None
+        now = time.monotonic()
+        while self.requests and now - self.requests[0] >= 60:
+            self.requests.popleft()
+        if len(self.requests) >= self.per_minute:
+            return 60 - (now - self.requests[0])
+        self.requests.append(now)
+        return None
+
+class UpstreamSimulator:
+    """Request handling and fault injection shared by both endpoints"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.collections: Dict[str, SimulatedCollection] = {
+            slug: SimulatedCollection(slug, args.wallets, args.pool or args.wallets * 2,
+                                      args.mean_inscriptions, random.Random(f'{args.seed}-{slug}'))
+            for slug in args.slugs
+        }
+        self.bios: Dict[str, str] = {}
+        self.quotas = {
+            'bestinslot': QuotaWindow(args.bestinslot_qpm),
+            'magiceden': QuotaWindow(args.magiceden_qpm),
+        }
+        self.stats: Dict[str, Dict[str, int]] = {
+            api: {'requests': 0, 'ok': 0, 'not_modified': 0, 'throttled': 0, 'errors': 0, 'bytes': 0}
+            for api in self.quotas
+        }
+        self.mutations = 0
+
+    async def fault(self, api: str) -> Optional[web.Response]:
+        """Apply latency and decide whether this request fails"""
+        stats = self.stats[api]
+        stats['requests'] += 1
+        await asyncio.sleep(self.args.latency + self.rng.uniform(0, self.args.jitter))
+
+        retry_after = self.quotas[api].retry_after()
+        if retry_after is None and self.rng.random() < self.args.throttle_rate:
+            retry_after = self.args.retry_after
+        if retry_after is not None:
+            stats['throttled'] += 1
+            return web.Response(status=429, text='Too Many Requests',
+                                headers={'Retry-After': str(max(1, round(retry_after)))})
+        if self.rng.random() < self.args.error_rate:
+            stats['errors'] += 1
+            return web.Response(status=self.rng.choice((500, 502, 503)), text='Simulated upstream error')
+        return None
+
+    async def snapshot(self, request: web.Request) -> web.StreamResponse:
+        failure = await self.fault('bestinslot')
+        if failure is not None:
+            return failure
+        collection = self.collections.get(request.query.get('slug', ''))
+        if collection is None:
+            return web.Response(status=404, text='Unknown collection')
+        if request.query.get('type') != 'csv':
+            return web.Response(status=400, text='Only type=csv is simulated')
+
+        headers = {'ETag': collection.etag, 'Last-Modified': collection.last_modified}
+        if request.headers.get('If-None-Match') == collection.etag:
+            self.stats['bestinslot']['not_modified'] += 1
+            return web.Response(status=304, headers=headers)
+
+        body = collection.body()
+        response = web.StreamResponse(headers={**headers, 'Content-Type': 'text/csv'})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            await response.write(chunk)
+            if self.args.bandwidth:
+                await asyncio.sleep(len(chunk) / self.args.bandwidth)
+        await response.write_eof()
+        self.stats['bestinslot']['ok'] += 1
+        self.stats['bestinslot']['bytes'] += len(body)
+        return response
+
+    async def wallet(self, request: web.Request) -> web.Response:
+        failure = await self.fault('magiceden')
+        if failure is not None:
+            return failure
+        address = request.match_info['address']
+        body = json.dumps({'address': address, 'bio': self.bios.get(address, '')})
+        self.stats['magiceden']['ok'] += 1
+        self.stats['magiceden']['bytes'] += len(body)
+        return web.Response(text=body, content_type='application/json')
+
+    async def set_bio(self, request: web.Request) -> web.Response:
+        self.bios[request.match_info['address']] = await request.text()
+        return web.Response(status=204)
+
+    async def mutate_now(self, request: web.Request) -> web.Response:
+        return web.json_response({'moved': self.mutate()})
+
+    async def stats_view(self, request: web.Request) -> web.Response:
+        return web.json_response(self.snapshot_stats())
+
+    def snapshot_stats(self) -> dict:
+        return {
+            'apis': self.stats,
+            'mutations': self.mutations,
+            'collections': {
+                slug: {'holders': len(c.holders), 'version': c.version, 'bytes': len(c.body())}
+                for slug, c in self.collections.items()
+            },
+        }
+
+    def mutate(self) -> int:
+        self.mutations += 1
+        return sum(c.mutate(self.args.mutate_fraction) for c in self.collections.values())
+
+    async def mutation_loop(self):
+        while True:
+            await asyncio.sleep(self.args.mutate_every)
+            moved = self.mutate()
+            print(f'[sim] mutation {self.mutations}: moved {moved} inscriptions')
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/collection/snapshot', self.snapshot)
+        app.router.add_get('/v2/wallets/{address}', self.wallet)
+        app.router.add_put('/_sim/bios/{address}', self.set_bio)
+        app.router.add_post('/_sim/mutate', self.mutate_now)
+        app.router.add_get('/_sim/stats', self.stats_view)
+
+        async def start_mutations(app):
+            if self.args.mutate_every:
+                app['mutations'] = asyncio.create_task(self.mutation_loop())
+
+        async def stop_mutations(app):
+            if 'mutations' in app:
+                app['mutations'].cancel()
+
+        app.on_startup.append(start_mutations)
+        app.on_cleanup.append(stop_mutations)
+        return app
+
+async def start_simulator(args) -> web.AppRunner:
+    runner = web.AppRunner(UpstreamSimulator(args).app())
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    print(f'[sim] serving http://{args.host}:{args.port} '
+          f'({len(args.slugs)} collections x {args.wallets} wallets)')
+    return runner
+
+async def serve(args):
+    runner = await start_simulator(args)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+# ---------------------------------------------------------------------------
+# Load driver
+# ---------------------------------------------------------------------------
+
+class DriverStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, action: str, seconds: float, outcome: str):
+        self.latencies.setdefault(action, []).append(seconds)
+        counts = self.outcomes.setdefault(action, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    def total(self) -> int:
+        """Flows recorded; background refreshes are part of the flow that started them"""
+        return sum(len(samples) for action, samples in self.latencies.items() if not action.endswith('_refresh'))
+
+def outcome_of(interaction) -> str:
+    """Classify a finished flow by the last message the user saw"""
+    messages = interaction.followup.messages or interaction.response.messages
+    last = (messages[-1] if messages else '') or ''
+    if last.startswith('❌'):
+        return 'rejected'
+    if last.startswith('⚠️'):
+        return 'warning'
+    return 'ok'
+
+async def drive(args):
+    # The bot reads its configuration at import time, so set it up first
+    base_url = args.url or f'http://{args.host}:{args.port}'
+    os.environ['BESTINSLOT_API'] = f'{base_url}/collection/snapshot'
+    os.environ['MAGICEDEN_API'] = f'{base_url}/v2/wallets/'
+    sys.path.insert(0, str(REPO_DIR))
+    import benchmark as bench
+    vb = bench.vb
+
+    # The benchmark fakes switch client-side rate limiting off; put it back
+    qpm = args.bot_qpm or vb.RATE_LIMIT_QPM
+    vb.bestinslot_limiter = vb.TokenBucket('bestinslot', qpm, args.bot_burst)
+    vb.magiceden_limiter = vb.TokenBucket('magiceden', qpm, args.bot_burst)
+
+    runner = None if args.url else await start_simulator(args)
+    rng = random.Random(args.seed)
+    stats = DriverStats()
+    guild = bench.FakeGuild(10_000, list(vb.COLLECTIONS.values()))
+    vb.guild_collections.seed(guild.id, vb.COLLECTIONS)
+    vb.sweep_engine = vb.SweepEngine(args.sweep_concurrency)
+    pool = args.pool or args.wallets * 2
+
+    async with ClientSession() as admin:
+        async def set_bio(address: str, bio: str):
+            async with admin.put(f'{base_url}/_sim/bios/{address}', data=bio) as response:
+                response.raise_for_status()
+
+        async def user_session(member, addresses: List[str], deadline: float):
+            user_id = str(member.id)
+            await asyncio.sleep(rng.uniform(0, args.ramp_up))
+            while time.monotonic() < deadline:
+                pending = [a for a in addresses if a not in vb.address_registry.get(user_id)]
+                interaction = bench.FakeInteraction(guild, member)
+                if pending and rng.random() < args.add_ratio:
+                    address = pending[0]
+                    if rng.random() >= args.missing_bio_rate:
+                        await set_bio(address, f'gm {vb.get_user_verification_code(user_id)}')
+                    action = 'add_address'
+                    started = time.perf_counter()
+                    await vb.AddAddressModal.on_submit(SimpleNamespace(address=address), interaction)
+                else:
+                    action = 'verify'
+                    started = time.perf_counter()
+                    await interaction.response.defer(ephemeral=True)
+                    await vb.verify._callback(interaction)
+                answered = time.perf_counter() - started
+                # Users read the reply once the background refresh has settled it
+                refresh = interaction.extras.get('verification_refresh')
+                if refresh is not None:
+                    await refresh
+                    stats.record(f'{action}_refresh', time.perf_counter() - started, outcome_of(interaction))
+                stats.record(action, answered, outcome_of(interaction))
+                await asyncio.sleep(rng.expovariate(1 / args.think_time) if args.think_time else 0)
+
+        async def sweep_loop():
+            while True:
+                await asyncio.sleep(args.sweep_interval)
+                summary = await vb.sweep_engine.run(guild, vb.address_registry.user_ids())
+                print(f'[driver] sweep: {summary.users_total} users, {summary.members_changed} changed, '
+                      f'{summary.errors} errors in {summary.duration:.1f}s')
+
+        async def report_loop(started: float):
+            previous = 0
+            while True:
+                await asyncio.sleep(args.report_interval)
+                total = stats.total()
+                print(f'[driver] t={time.monotonic() - started:.0f}s flows={total} '
+                      f'rate={(total - previous) / args.report_interval:.1f}/s')
+                previous = total
+
+        members = []
+        for i in range(args.users):
+            member = bench.FakeMember(200_000 + i, guild, args.edit_latency)
+            guild.add_member(member)
+            addresses = [sim_wallet(rng.randrange(pool)) for _ in range(args.addresses_per_user)]
+            members.append((member, addresses))
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        background = [asyncio.create_task(report_loop(started))]
+        if args.sweep_interval:
+            background.append(asyncio.create_task(sweep_loop()))
+        try:
+            await asyncio.gather(*(user_session(member, addresses, deadline) for member, addresses in members))
+        finally:
+            for task in background:
+                task.cancel()
+            elapsed = time.monotonic() - started
+
+        async with admin.get(f'{base_url}/_sim/stats') as response:
+            upstream = await response.json()
+
+    await vb.close_http_session()
+    vb.verification_codes.flush()
+    if runner is not None:
+        await runner.cleanup()
+
+    print(f'\n{stats.total()} flows from {args.users} users in {elapsed:.1f}s '
+          f'({stats.total() / elapsed:.1f}/s)')
+    for action, samples in stats.latencies.items():
+        latency = ', '.join(f'{key}={value:.1f}' for key, value in bench.percentiles(samples).items())
+        print(f'  {action:<12} n={len(samples)} {latency} outcomes={stats.outcomes[action]}')
+    print('\nUpstream:')
+    for api, counts in upstream['apis'].items():
+        print(f'  {api:<11} ' + ', '.join(f'{key}={value}' for key, value in counts.items()))
+    print(f'  mutations={upstream["mutations"]}')
+    print('\nBot metrics:')
+    for line in vb.metrics.render().splitlines():
+        if line.startswith('verifier_') and '_bucket{' not in line:
+            print(f'  {line}')
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def add_simulator_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--slugs', nargs='+',
+                        default=['pixelpepes', 'space-pepes', 'soy-pepes', 'clay-pepes', 'pixel-mumus'],
+                        help='collection slugs to serve')
+    parser.add_argument('--wallets', type=int, default=20_000, help='holders per collection (payload size)')
+    parser.add_argument('--pool', type=int, default=0,
+                        help='size of the wallet pool holders are drawn from (default 2x --wallets)')
+    parser.add_argument('--mean-inscriptions', type=float, default=2.0, help='average inscriptions per holder')
+    parser.add_argument('--latency', type=float, default=0.05, help='base seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.05, help='extra random seconds per request')
+    parser.add_argument('--bandwidth', type=float, default=0, help='snapshot bytes per second (0 = unlimited)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=2, help='Retry-After seconds on injected 429s')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 5xx')
+    parser.add_argument('--bestinslot-qpm', type=int, default=0, help='enforced BestInSlot quota (0 = none)')
+    parser.add_argument('--magiceden-qpm', type=int, default=0, help='enforced Magic Eden quota (0 = none)')
+    parser.add_argument('--mutate-every', type=float, default=0, help='seconds between snapshot mutations')
+    parser.add_argument('--mutate-fraction', type=float, default=0.01,
+                        help='share of holders transferring an inscription per mutation')
+    parser.add_argument('--seed', type=int, default=1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Local BestInSlot/Magic Eden simulator and load driver')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='run the simulator')
+    add_simulator_arguments(serve_parser)
+
+    drive_parser = commands.add_parser('drive', help='simulate concurrent users against a simulator')
+    add_simulator_arguments(drive_parser)
+    drive_parser.add_argument('--url', help='existing simulator to use instead of starting one')
+    drive_parser.add_argument('--users', type=int, default=200, help='concurrent simulated users')
+    drive_parser.add_argument('--addresses-per-user', type=int, default=1)
+    drive_parser.add_argument('--duration', type=float, default=60, help='seconds to run')
+    drive_parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which users arrive')
+    drive_parser.add_argument('--think-time', type=float, default=5, help='mean seconds between user actions')
+    drive_parser.add_argument('--add-ratio', type=float, default=0.5,
+                              help='chance a user with unregistered addresses adds one instead of verifying')
+    drive_parser.add_argument('--missing-bio-rate', type=float, default=0.1,
+                              help='share of Add Address attempts made without the code in the bio')
+    drive_parser.add_argument('--edit-latency', type=float, default=0.05,
+                              help='simulated seconds per Discord member edit')
+    drive_parser.add_argument('--sweep-interval', type=float, default=0, help='seconds between sweeps (0 = off)')
+    drive_parser.add_argument('--sweep-concurrency', type=int, default=4)
+    drive_parser.add_argument('--report-interval', type=float, default=10)
+    drive_parser.add_argument('--bot-qpm', type=int, default=0,
+                              help="bot's per-API request budget (default: its production limit)")
+    drive_parser.add_argument('--bot-burst', type=int, default=5)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args) if args.command == 'serve' else drive(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
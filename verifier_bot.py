@@ -1,45 +1,158 @@
 import os
 import sys
+import time
+STARTUP_STARTED = time.monotonic()  # reference point for the startup phase breakdown
 import discord
 from discord.ext import commands
 from discord import app_commands, ButtonStyle
 import logging
+import logging.handlers
+import queue
+import atexit
 import json
-import requests
-from io import StringIO
-import pandas as pd
-from typing import List, Tuple, Optional, Dict
+import aiohttp
+import csv
+import hashlib
+import sqlite3
+import threading
+import contextlib
+import mmap
+import struct
+from email.utils import parsedate_to_datetime
+from typing import Any, List, Tuple, Optional, Dict, Set
 from pathlib import Path
-import secrets
 import asyncio
+import contextvars
+import heapq
 from collections import deque
-import pandas as pd
-from datetime import datetime, timedelta
-import pickle
+from collections.abc import ItemsView, Mapping
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+import math
 import random
+import re
 import string
-
-# Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Changed to DEBUG for more detailed logs
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log')
-    ],
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+import functools
 
 # Load environment variables
 load_dotenv()
 
+# Set up logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text' or 'json'
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+# Sweep workers never share the bot's log file; '{pid}' is replaced by the worker's PID, empty logs to stdout only
+WORKER_LOG_FILE = os.getenv('WORKER_LOG_FILE', '')
+SWEEP_WORKER = '--worker' in sys.argv  # this process is a sweep worker rather than the bot
+LOG_MAX_BYTES = 50 * 1024 * 1024  # rotate bot.log at this size
+LOG_BACKUPS = 5
+LOG_SAMPLE_LIMIT = int(os.getenv('LOG_SAMPLE_LIMIT', '20'))  # DEBUG/INFO lines per call site per window
+LOG_SAMPLE_WINDOW = 60  # seconds
+AUDIT_LOG = {'audit': True}  # extra= for role changes, which are never sampled away
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class LogSampler(logging.Filter):
+    """Rate-limits DEBUG and INFO records per call site
+
+    Each line of code may log ``limit`` records per window; the rest are
+    dropped and counted, and the count is reported on the next record let
+    through. Warnings, errors and audit records (role changes, logged with
+    ``extra=AUDIT_LOG``) always pass.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites: Dict[Tuple[str, int], List] = {}  # call site -> [window start, emitted, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.limit <= 0 or getattr(record, 'audit', False):
+            return True
+        site = (record.pathname, record.lineno)
+        state = self._sites.get(site)
+        if state is None or record.created - state[0] >= self.window:
+            suppressed = state[2] if state else 0
+            self._sites[site] = [record.created, 1, 0]
+            if suppressed:
+                record.msg = f'{record.getMessage()} ({suppressed} similar lines suppressed)'
+                record.args = None
+            return True
+        if state[1] < self.limit:
+            state[1] += 1
+            return True
+        state[2] += 1
+        return False
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background thread
+
+    The event loop only enqueues records; formatting and the stdout/file
+    writes happen on the listener thread.
+    """
+    if LOG_FORMAT == 'json':
+        formatter = JsonLogFormatter(datefmt='%Y-%m-%dT%H:%M:%S')
+    else:
+        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    # Only one process may rotate a file, so workers get their own or none
+    log_file = WORKER_LOG_FILE.format(pid=os.getpid()) if SWEEP_WORKER else LOG_FILE
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(LogSampler(LOG_SAMPLE_LIMIT, LOG_SAMPLE_WINDOW))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
+
 # Configuration
 BOT_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
-BESTINSLOT_API = "https://v2api.bestinslot.xyz/collection/snapshot"
-MAGICEDEN_API = "https://api-mainnet.magiceden.dev/v2/wallets/"
+# Upstream endpoints; override to point the bot at a local simulator (see upstream_sim.py)
+BESTINSLOT_API = os.getenv('BESTINSLOT_API', "https://v2api.bestinslot.xyz/collection/snapshot")
+MAGICEDEN_API = os.getenv('MAGICEDEN_API', "https://api-mainnet.magiceden.dev/v2/wallets/")
 RATE_LIMIT_QPM = 30
 RATE_LIMIT_WINDOW = 60  # seconds
+BESTINSLOT_RATE_LIMIT_QPM = int(os.getenv('BESTINSLOT_RATE_LIMIT_QPM', str(RATE_LIMIT_QPM)))
+BESTINSLOT_RATE_LIMIT_BURST = int(os.getenv('BESTINSLOT_RATE_LIMIT_BURST', '5'))
+MAGICEDEN_RATE_LIMIT_QPM = int(os.getenv('MAGICEDEN_RATE_LIMIT_QPM', str(RATE_LIMIT_QPM)))
+MAGICEDEN_RATE_LIMIT_BURST = int(os.getenv('MAGICEDEN_RATE_LIMIT_BURST', '5'))
+for _name, _qpm in (('BESTINSLOT_RATE_LIMIT_QPM', BESTINSLOT_RATE_LIMIT_QPM), ('MAGICEDEN_RATE_LIMIT_QPM', MAGICEDEN_RATE_LIMIT_QPM)):
+    if _qpm <= 0:
+        raise ValueError(f"{_name} must be a positive number of requests per minute, got {_qpm}")
+# Share of upstream tokens and role edit slots guaranteed to background work while users are waiting too
+BACKGROUND_MIN_SHARE = float(os.getenv('BACKGROUND_MIN_SHARE', '0.2'))
+ROLE_EDIT_CONCURRENCY = int(os.getenv('ROLE_EDIT_CONCURRENCY', '2'))  # Discord role edits in flight at once
+MEMBER_PAGE_SIZE = 1000  # members per page of Discord's member list endpoint
+# Server Members Intent; set to false if the bot isn't allowed it, members are then looked up over REST
+MEMBERS_INTENT = os.getenv('MEMBERS_INTENT', 'true').lower() != 'false'
+UPSTREAM_MAX_RETRIES = 3  # retries after a 429 or 5xx response
+UPSTREAM_BACKOFF_BASE = 2  # seconds, doubled on each retry
 CHECK_INTERVAL = 60  # seconds
 VERIFICATION_TIMEOUT = 1800  # 30 minutes
 USER_DATA_FILE = 'data/user_addresses.json'
@@ -47,9 +160,318 @@ DATA_DIR = Path('data')
 WALLETS_FILE = DATA_DIR / 'wallets.json'
 VERIFICATION_CODES_FILE = DATA_DIR / 'verification_codes.json'
 LOCK_FILE = DATA_DIR / 'lock.file'
-WALLET_CHECK_INTERVAL = 30  # Check every 30 minutes
+DB_FILE = DATA_DIR / 'verifier.db'
+ME_BIO_POSITIVE_TTL = int(os.getenv('ME_BIO_POSITIVE_TTL', '600'))  # seconds a bio containing the code is reused
+ME_BIO_NEGATIVE_TTL = int(os.getenv('ME_BIO_NEGATIVE_TTL', '20'))  # seconds a bio without the code is reused
+ME_BIO_REFRESH_FLOOR = int(os.getenv('ME_BIO_REFRESH_FLOOR', '10'))  # minimum seconds between fetches of one bio
+ME_BIO_CACHE_SIZE = 10000  # entries kept before expired ones are pruned
+CODE_FLUSH_DELAY = 2  # seconds new verification codes wait before being written in one batch
+WALLET_CHECK_INTERVAL = int(os.getenv('WALLET_CHECK_INTERVAL', '30'))  # minutes between checks of a new user
+CHECK_INTERVAL_MIN = int(os.getenv('CHECK_INTERVAL_MIN', '5'))  # minutes, for users whose holdings just changed
+CHECK_INTERVAL_MAX = int(os.getenv('CHECK_INTERVAL_MAX', '240'))  # minutes, for long-term stable holders
+CHECK_JITTER = 0.2  # each next check lands within +/-20% of the user's interval
+CHECK_TICK = int(os.getenv('CHECK_TICK', '30'))  # seconds between passes over users that are due
+ACTIVE_COLLECTION_CHURN = 0.01  # share of holders changing per refresh that marks a collection as actively trading
+SWEEP_CONCURRENCY = int(os.getenv('SWEEP_CONCURRENCY', '4'))  # users reconciled in parallel during a sweep
+SWEEP_START_JITTER = int(os.getenv('SWEEP_START_JITTER', '30'))  # max random delay (seconds) before the first sweep
+SWEEP_MODE = os.getenv('SWEEP_MODE', 'inline')  # 'inline', or 'queue' to reconcile in separate --worker processes
+SWEEP_JOB_LEASE = int(os.getenv('SWEEP_JOB_LEASE', '300'))  # seconds before a job held by a dead worker is retried
+SWEEP_JOB_MAX_ATTEMPTS = 3
+SWEEP_POLL_INTERVAL = 2  # seconds between job queue polls
+SNAPSHOT_TTL = int(os.getenv('SNAPSHOT_TTL', '300'))  # seconds a collection snapshot is reused
+SNAPSHOT_MAX_PENDING_DELTAS = 100  # per collection, before every member is rechecked instead
+SNAPSHOT_CHUNK_SIZE = 64 * 1024  # bytes read per step while streaming a snapshot
+SNAPSHOT_DIR = Path(os.getenv('SNAPSHOT_DIR', str(DATA_DIR / 'snapshots')))  # parsed snapshots kept across restarts
+HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', '60'))  # seconds per upstream request
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))  # total pooled upstream connections
+HTTP_POOL_PER_HOST = int(os.getenv('HTTP_POOL_PER_HOST', '4'))  # pooled connections per upstream host
+# Gateway sharding for large deployments; unset lets Discord pick the shard count
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS', '').split(',') if shard.strip()] or None
+
+# Metrics
+METRICS_HOST = '127.0.0.1'  # only ever served on loopback
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 disables the metrics endpoint
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SWEEP_BUCKETS = (1, 5, 15, 60, 300, 900, 1800, 3600)
+
+class Metric:
+    """A named Prometheus metric family with one value per label set"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+        if not key:
+            return ''
+        escaped = (
+            (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for name, value in key
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, key, value
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for name, key, value in self.samples():
+            lines.append(f'{name}{self._format_labels(key)} {value:g}')
+        return '\n'.join(lines)
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[Tuple[str, str], ...], List] = {}  # key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in self._series.items():
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', key + (('le', f'{bound:g}'),), bucket_count
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', key, total
+            yield f'{self.name}_count', key, count
+
+class MetricsRegistry:
+    """Holds every metric and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def collector(self, func):
+        """Register a function that refreshes gauges right before each scrape"""
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                logging.error(f'Error collecting metrics: {e}')
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+metrics = MetricsRegistry()
+SNAPSHOT_FETCH_SECONDS = metrics.histogram(
+    'verifier_snapshot_fetch_seconds', 'Time to download and parse a collection snapshot')
+SNAPSHOT_PARSE_SECONDS = metrics.histogram(
+    'verifier_snapshot_parse_seconds', 'CPU time spent parsing a collection snapshot')
+SNAPSHOT_BYTES = metrics.counter(
+    'verifier_snapshot_bytes_total', 'Snapshot bytes downloaded from BestInSlot')
+SNAPSHOT_HOLDERS = metrics.gauge(
+    'verifier_snapshot_holders', 'Wallets in the cached snapshot index')
+SNAPSHOT_AGE = metrics.gauge(
+    'verifier_snapshot_age_seconds', 'Age of the cached snapshot')
+CACHE_REQUESTS = metrics.counter(
+    'verifier_cache_requests_total', 'Cache lookups by cache and result')
+COALESCED_REQUESTS = metrics.counter(
+    'verifier_coalesced_requests_total', 'Calls that joined an in-flight upstream request')
+UPSTREAM_REQUEST_SECONDS = metrics.histogram(
+    'verifier_upstream_request_seconds', 'Upstream response time until headers, by upstream and status')
+UPSTREAM_THROTTLED = metrics.counter(
+    'verifier_upstream_throttled_total', '429 responses from upstream APIs')
+RATE_LIMIT_WAIT_SECONDS = metrics.histogram(
+    'verifier_rate_limit_wait_seconds', 'Time spent waiting for an upstream rate limit token')
+SCHEDULER_QUEUE_DEPTH = metrics.gauge(
+    'verifier_scheduler_queue_depth', 'Callers waiting for an upstream token or role edit slot, by priority')
+SCHEDULER_WAIT_SECONDS = metrics.histogram(
+    'verifier_scheduler_wait_seconds', 'Time spent waiting for an upstream token or role edit slot, by priority')
+ROLE_EDITS = metrics.counter(
+    'verifier_discord_role_edits_total', 'Member role edits sent to Discord by outcome')
+DISCORD_RATE_LIMITED = metrics.counter(
+    'verifier_discord_rate_limited_total', '429 responses from Discord')
+SWEEP_SECONDS = metrics.histogram(
+    'verifier_sweep_duration_seconds', 'Duration of role sweeps', SWEEP_BUCKETS)
+SWEEP_USERS = metrics.counter(
+    'verifier_sweep_users_total', 'Users processed by role sweeps')
+SWEEP_ERRORS = metrics.counter(
+    'verifier_sweep_errors_total', 'Users that failed during role sweeps')
+SWEEP_RUNNING = metrics.gauge(
+    'verifier_sweep_running', 'Whether a sweep is in progress')
+SWEEP_LAST_DURATION = metrics.gauge(
+    'verifier_sweep_last_duration_seconds', 'Duration of the last finished sweep')
+INTERACTION_SECONDS = metrics.histogram(
+    'verifier_interaction_seconds', 'Time from interaction creation to handler completion, by command or custom_id')
+CHECKS_DUE = metrics.gauge(
+    'verifier_checks_due', 'Registered members past their next scheduled check, by guild')
+CHECKS_EXPEDITED = metrics.counter(
+    'verifier_checks_expedited_total', 'Checks moved forward because a snapshot delta touched the member')
+STARTUP_PHASE_SECONDS = metrics.gauge(
+    'verifier_startup_phase_seconds', 'Seconds from process start until each startup phase completed')
+
+class StartupTimer:
+    """Records when each startup phase completed, relative to process start
+
+    Phases: imports, login, command_sync, ready, caches_warm and first_verify
+    (the first Verify that applied roles without errors). Each is logged once
+    with the time since the previous phase, giving a breakdown per deploy.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str):
+        if phase in self.phases:
+            return
+        elapsed = time.monotonic() - self.started
+        previous = max(self.phases.values(), default=0.0)
+        self.phases[phase] = elapsed
+        STARTUP_PHASE_SECONDS.set(round(elapsed, 3), phase=phase)
+        logging.info(f'Startup phase {phase} completed after {elapsed:.2f}s (+{max(0.0, elapsed - previous):.2f}s)')
+
+startup = StartupTimer(STARTUP_STARTED)
+
+class DiscordRateLimitCounter(logging.Filter):
+    """Counts each 429 discord.py reports while handling it itself, once
+
+    discord.py logs every 429 and then, if it was global, a second line
+    without awaiting in between, so the scope is settled on the next loop
+    iteration rather than counting both lines.
+    """
 
-# Collection configurations
+    def __init__(self):
+        super().__init__()
+        self._pending: Dict[Any, str] = {}  # task -> scope of its latest 429
+
+    def _settle(self, task):
+        scope = self._pending.pop(task, None)
+        if scope:
+            DISCORD_RATE_LIMITED.inc(scope=scope)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # The logger is pinned to WARNING so 429s are counted, but LOG_LEVEL still decides what is logged
+        shown = record.levelno >= logging.getLogger().level
+        if record.levelno < logging.WARNING:
+            return shown
+        message = str(record.msg)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        task = asyncio.current_task(loop) if loop else None
+        if 'responded with 429' in message:
+            if loop is None or 'too long' in message:
+                DISCORD_RATE_LIMITED.inc(scope='route')  # raised right away, no global line follows
+            else:
+                self._settle(task)  # a previous 429 of this task not settled yet
+                self._pending[task] = 'route'
+                loop.call_soon(self._settle, task)
+        elif message.startswith('Global rate limit'):
+            if task in self._pending:
+                self._pending[task] = 'global'
+            else:
+                DISCORD_RATE_LIMITED.inc(scope='global')
+        return shown
+
+discord_http_log = logging.getLogger('discord.http')
+discord_http_log.setLevel(min(logging.WARNING, logging.getLogger().level))
+discord_http_log.addFilter(DiscordRateLimitCounter())
+
+def observe_interaction(interaction: discord.Interaction, name: str):
+    """Record how long an interaction took from creation to now"""
+    latency = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    INTERACTION_SECONDS.observe(latency, name=name)
+
+def timed_interaction(name: Optional[str] = None):
+    """Decorator recording the latency of a button or modal callback
+
+    Buttons are labeled by their custom_id unless a name is given.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args):
+            try:
+                return await func(self, interaction, *args)
+            finally:
+                label = name or (interaction.data or {}).get('custom_id', func.__name__)
+                observe_interaction(interaction, label)
+        return wrapper
+    return decorator
+
+async def handle_metrics_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve GET /metrics over a bare-bones HTTP/1.0 exchange"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass  # skip headers
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] in ('/', '/metrics'):
+            status, body = '200 OK', metrics.render().encode()
+        else:
+            status, body = '404 Not Found', b'not found\n'
+        writer.write(
+            f'HTTP/1.0 {status}\r\n'
+            f'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server() -> Optional[asyncio.AbstractServer]:
+    """Expose metrics on the loopback interface if METRICS_PORT is set"""
+    if not METRICS_PORT:
+        return None
+    server = await asyncio.start_server(handle_metrics_request, METRICS_HOST, METRICS_PORT)
+    logging.info(f'Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics')
+    return server
+
+# Default collection configuration, applied to the GUILD_ID server the first
+# time it starts; every other server configures its own with /set_collection
 COLLECTIONS = {
     'pixelpepes': 'Pixel Pepe Holder',
     'space-pepes': 'Space Pepe Holder',
@@ -64,14 +486,25 @@ COLLECTIONS = {
 # Initialize bot with minimal required intents and permissions
 intents = discord.Intents.default()
 intents.guilds = True  # Only need guilds intent for slash commands
-# intents.members = True  # Need member updates for booster tracking - commented out as no longer needed
+intents.members = MEMBERS_INTENT  # Lets the sweep look members up in discord.py's member cache
 intents.message_content = True  # Required for prefix commands to work
 
+class VerifierBot(commands.AutoShardedBot):
+    async def close(self):
+        await close_http_session()
+        await super().close()
+        verification_codes.flush()
+        store.close()
+
 # Initialize bot with minimal intents
-bot = commands.Bot(
+bot = VerifierBot(
     command_prefix='!',
     intents=intents,
-    description='Pixel Pepes Verifier Bot'
+    description='Pixel Pepes Verifier Bot',
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
+    # Chunking every guild before on_ready would hold up startup; guilds are chunked on their first sweep instead
+    chunk_guilds_at_startup=False
 )
 
 class CommandView(discord.ui.View):
@@ -79,22 +512,27 @@ class CommandView(discord.ui.View):
         super().__init__(timeout=None)
 
     @discord.ui.button(label='Add Address', style=ButtonStyle.primary, custom_id='add_address_button', row=0)
+    @timed_interaction()
     async def add_address_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.send_modal(AddAddressModal())
 
     @discord.ui.button(label='Remove Address', style=ButtonStyle.danger, custom_id='remove_address_button', row=0)
+    @timed_interaction()
     async def remove_address_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.send_modal(RemoveAddressModal())
 
     @discord.ui.button(label='List Addresses', style=ButtonStyle.secondary, custom_id='list_addresses_button', row=1)
+    @timed_interaction()
     async def list_addresses_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await list_addresses._callback(interaction)
 
     @discord.ui.button(label='Check Roles', style=ButtonStyle.secondary, custom_id='check_roles_button', row=1)
+    @timed_interaction()
     async def check_roles_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await check_roles._callback(interaction)
 
     @discord.ui.button(label='Verify Now', style=ButtonStyle.success, custom_id='verify_help_button', row=2)
+    @timed_interaction()
     async def verify_help_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
         await verify._callback(interaction)
@@ -102,17 +540,19 @@ class CommandView(discord.ui.View):
 class AddAddressModal(discord.ui.Modal, title='Add Wallet Address'):
     address = discord.ui.TextInput(label='Wallet Address', placeholder='Enter your wallet address here')
 
+    @timed_interaction('add_address_modal')
     async def on_submit(self, interaction: discord.Interaction):
         user_id = str(interaction.user.id)
         address = str(self.address)
         
         # Get the user's verification code
-        verification_code = await get_user_verification_code(user_id)
+        verification_code = get_user_verification_code(user_id)
         
-        # Check bio verification first
+        # The bio check can wait on the Magic Eden rate limit well past Discord's 3s deadline
+        await interaction.response.defer(ephemeral=True, thinking=True)
         has_bio = await verify_me_bio(address, user_id)
         if not has_bio:
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "❌ Please add your verification code to your Magic Eden bio first!\n" \
                 f"Your verification code is: **{verification_code}**\n\n" \
                 "This code helps protect your privacy by not revealing your Discord ID.", 
@@ -125,6 +565,7 @@ class AddAddressModal(discord.ui.Modal, title='Add Wallet Address'):
 class RemoveAddressModal(discord.ui.Modal, title='Remove Wallet Address'):
     address = discord.ui.TextInput(label='Wallet Address', placeholder='Enter the wallet address to remove')
 
+    @timed_interaction('remove_address_modal')
     async def on_submit(self, interaction: discord.Interaction):
         await remove_address._callback(interaction, str(self.address))
 
@@ -133,11 +574,13 @@ class VerificationView(discord.ui.View):
         super().__init__(timeout=None)
 
     @discord.ui.button(label='Verify', style=ButtonStyle.primary, custom_id='verify_button')
+    @timed_interaction()
     async def verify_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
         await verify._callback(interaction)
 
     @discord.ui.button(label='Help', style=ButtonStyle.secondary, custom_id='help_button')
+    @timed_interaction()
     async def help_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         help_text = (
             "**🐸 Pixel Pepes Verifier Bot Help**\n\n"
@@ -162,71 +605,641 @@ REQUIRED_PERMISSIONS = discord.Permissions(
 # Remove default help command as we'll use slash commands
 bot.remove_command('help')
 
+def get_holder_roles(guild: discord.Guild) -> Dict[str, discord.Role]:
+    """Resolve the holder role of every collection configured for a guild"""
+    roles = {}
+    for collection_slug, role_name in guild_collections.get(guild.id).items():
+        role = discord.utils.get(guild.roles, name=role_name)
+        if not role:
+            logging.warning(f'Could not find role {role_name} in {guild.name}')
+            continue
+        roles[collection_slug] = role
+    return roles
+
+def get_rule_roles(guild: discord.Guild) -> List[Tuple['RoleRule', discord.Role]]:
+    """Resolve the role of every rule configured for a guild"""
+    roles = []
+    for rule in role_rules.get(guild.id):
+        role = discord.utils.get(guild.roles, name=rule.role_name)
+        if not role:
+            logging.warning(f'Could not find role {rule.role_name} in {guild.name}')
+            continue
+        roles.append((rule, role))
+    return roles
+
+class ManagedRoles:
+    """The roles the bot manages in one guild and what earns each of them
+
+    Every collection's holder role is earned by holding anything in it; rule
+    roles by meeting their RoleRule. Roles may be Role objects or bare role
+    IDs, so the interactive commands, the inline sweep and the sweep workers
+    all evaluate members the same way.
+    """
+
+    def __init__(self, holder_roles: Dict[str, Any], rule_roles: List[Tuple['RoleRule', Any]]):
+        self.holder_roles = holder_roles
+        self.rule_roles = rule_roles
+
+    @classmethod
+    def for_guild(cls, guild: discord.Guild) -> 'ManagedRoles':
+        return cls(get_holder_roles(guild), get_rule_roles(guild))
+
+    @property
+    def slugs(self) -> List[str]:
+        """Every collection a member has to be checked against"""
+        return list(dict.fromkeys([*self.holder_roles, *(rule.slug for rule, _ in self.rule_roles)]))
+
+    @property
+    def roles(self) -> List[Any]:
+        return list(dict.fromkeys([*self.holder_roles.values(), *(role for _, role in self.rule_roles)]))
+
+    def evaluate(self, addresses: List[str], holdings: Dict[str, Tuple[int, Optional[str]]]) -> Set[Any]:
+        """Get the roles a member with these addresses and holdings earns"""
+        desired = {role for slug, role in self.holder_roles.items() if slug in holdings}
+        if self.rule_roles:
+            wallets = {normalize_address(address) for address in addresses}
+            for rule, role in self.rule_roles:
+                count = holdings.get(rule.slug, (0, None))[0]
+                if rule.matches(snapshot_cache.peek(rule.slug), wallets, count):
+                    desired.add(role)
+        return desired
+
+async def collect_holdings(addresses: List[str], collection_slugs) -> Dict[str, Tuple[int, Optional[str]]]:
+    """Get a user's combined holding in each collection across all of their addresses
+
+    Counts are summed and inscriptions joined, so tier rules see everything
+    the user holds however it is spread over their wallets.
+    """
+    holdings = {}
+    for collection_slug in collection_slugs:
+        total = 0
+        owned = []
+        for address in addresses:
+            owns, count, inscriptions = await verify_ownership(address, collection_slug)
+            if owns and count:
+                total += count
+                if inscriptions:
+                    owned.append(inscriptions)
+        if total:
+            holdings[collection_slug] = (total, ','.join(owned))
+    return holdings
+
+async def apply_holder_roles(member: discord.Member, managed: ManagedRoles,
+                             desired: Set[discord.Role]) -> Tuple[List[discord.Role], List[discord.Role]]:
+    """Bring a member's managed roles in line with the ones they earn using a single member edit
+
+    Roles the bot doesn't manage are left untouched. Nothing is sent to
+    Discord if the member already has the right set.
+
+    Returns:
+        Tuple of (roles added, roles removed)
+    """
+    current = set(member.roles)
+    to_add = [role for role in managed.roles if role in desired and role not in current]
+    to_remove = [role for role in managed.roles if role not in desired and role in current]
+    if not to_add and not to_remove:
+        return [], []
+
+    try:
+        async with role_edit_scheduler.slot():
+            new_roles = [role for role in member.roles if not role.is_default() and role not in to_remove]
+            new_roles.extend(to_add)
+            await member.edit(roles=new_roles, reason='Ordinal holder verification')
+    except discord.Forbidden:
+        ROLE_EDITS.inc(outcome='forbidden')
+        raise
+    except Exception:
+        ROLE_EDITS.inc(outcome='error')
+        raise
+    ROLE_EDITS.inc(outcome='ok')
+    return to_add, to_remove
+
+async def get_member(guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+    """Look a member up in discord.py's member cache, or None if they aren't in the guild
+
+    With the members intent the guild is chunked over the gateway the first
+    time it's needed; without it, members the cache hasn't seen are fetched
+    over REST.
+    """
+    if MEMBERS_INTENT:
+        if not guild.chunked:
+            await guild.chunk(cache=True)
+        return guild.get_member(user_id)
+    member = guild.get_member(user_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+    return member
+
+async def member_ids(guild: discord.Guild) -> Optional[Set[int]]:
+    """IDs of every member of a guild, or None if the cache can't be trusted to be complete"""
+    if not MEMBERS_INTENT:
+        return None
+    if not guild.chunked:
+        await guild.chunk(cache=True)
+    return {member.id for member in guild.members}
+
+async def sweep_members(guild: discord.Guild, user_ids) -> Dict[int, discord.Member]:
+    """Resolve the members one sweep pass reconciles, skipping users not in the guild
+
+    Without the members intent, a batch larger than the guild's member list
+    is in pages is resolved by listing the members page by page instead of
+    fetching each one.
+    """
+    wanted = {int(user_id) for user_id in user_ids}
+    if not MEMBERS_INTENT and len(wanted) > math.ceil((guild.member_count or 0) / MEMBER_PAGE_SIZE):
+        members = {}
+        async for member in guild.fetch_members(limit=None):
+            if member.id in wanted:
+                members[member.id] = member
+        return members
+    members = {}
+    for user_id in wanted:
+        member = await get_member(guild, user_id)
+        if member is not None:
+            members[user_id] = member
+    return members
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    logging.info(f'Joined {guild.name} (id: {guild.id}); configure its collections with /set_collection')
+
+async def reconcile_user(guild: discord.Guild, user_id: str,
+                         member: Optional[discord.Member] = None) -> Tuple[List[discord.Role], List[discord.Role]]:
+    """Check a registered user's addresses against every collection and update their roles
+
+    ``member`` skips the lookup when the sweep has already resolved it.
+
+    Returns:
+        Tuple of (roles added, roles removed)
+    """
+    addresses = address_registry.get(user_id)
+    if member is None:
+        member = await get_member(guild, int(user_id))
+    if not member:
+        logging.warning(f'Could not find member with ID {user_id}')
+        return [], []
+
+    logging.debug(f'Checking addresses for user {member.name} ({user_id})')
+
+    managed = ManagedRoles.for_guild(guild)
+    holdings = await collect_holdings(addresses, managed.slugs)
+    changed = await store.run(store.save_holdings, user_id, holdings, managed.slugs)
+
+    added, removed = await apply_holder_roles(member, managed, managed.evaluate(addresses, holdings))
+    await check_schedule.record(guild.id, user_id, changed or bool(added or removed), holdings)
+    for role in added:
+        logging.info(f'Added role {role.name} to {member.name}', extra=AUDIT_LOG)
+    for role in removed:
+        logging.info(f'Removed role {role.name} from {member.name}', extra=AUDIT_LOG)
+    return added, removed
+
+class SweepSummary:
+    """Progress and outcome of one sweep"""
+
+    def __init__(self, guild_id: int, users_total: int):
+        self.guild_id = guild_id
+        self.users_total = users_total
+        self.users_processed = 0
+        self.members_changed = 0
+        self.roles_added = 0
+        self.roles_removed = 0
+        self.errors = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds the sweep ran for, or has been running"""
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def progress(self) -> float:
+        """Fraction of users processed"""
+        return self.users_processed / self.users_total if self.users_total else 1.0
+
+    def __str__(self) -> str:
+        return (f'{self.users_processed}/{self.users_total} users, {self.members_changed} members changed '
+                f'(+{self.roles_added}/-{self.roles_removed} roles), {self.errors} errors, '
+                f'{self.duration:.1f}s')
+
+class SweepEngine:
+    """Reconciles a batch of users with a bounded pool of workers
+
+    Throughput is limited by the upstream rate limiter and discord.py's
+    per-route rate limit handling rather than fixed sleeps; SWEEP_CONCURRENCY
+    only caps how many users are in flight. Only one sweep runs at a time.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self.current: Optional[SweepSummary] = None
+        self.last: Optional[SweepSummary] = None
+        self.last_by_guild: Dict[int, SweepSummary] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def current_for(self, guild_id: int) -> Optional[SweepSummary]:
+        """The running sweep of a guild, if any"""
+        if self.current is not None and self.current.guild_id == guild_id:
+            return self.current
+        return None
+
+    async def run(self, guild: discord.Guild, user_ids) -> Optional[SweepSummary]:
+        """Reconcile every given user, or return None if a sweep is already running"""
+        if self._lock.locked():
+            logging.warning('A sweep is already running, skipping this one')
+            return None
+
+        async with self._lock:
+            members = await sweep_members(guild, user_ids)
+            queue = asyncio.Queue()
+            for user_id in user_ids:
+                queue.put_nowait((user_id, members.get(int(user_id))))
+            summary = SweepSummary(guild.id, queue.qsize())
+            self.current = summary
+            SWEEP_RUNNING.set(1)
+            try:
+                workers = [
+                    asyncio.create_task(self._worker(guild, queue, summary))
+                    for _ in range(min(self.concurrency, summary.users_total))
+                ]
+                await asyncio.gather(*workers)
+            finally:
+                summary.finished_at = time.time()
+                self.current = None
+                self.last = summary
+                self.last_by_guild[guild.id] = summary
+                SWEEP_RUNNING.set(0)
+                SWEEP_SECONDS.observe(summary.duration)
+                SWEEP_LAST_DURATION.set(summary.duration)
+            logging.info(f'Sweep of {guild.name} finished: {summary}')
+            return summary
+
+    async def _worker(self, guild: discord.Guild, queue: asyncio.Queue, summary: SweepSummary):
+        while not queue.empty():
+            user_id, member = queue.get_nowait()
+            try:
+                if member is None:
+                    logging.warning(f'Could not find member with ID {user_id}')
+                    added, removed = [], []
+                else:
+                    added, removed = await reconcile_user(guild, user_id, member)
+                if added or removed:
+                    summary.members_changed += 1
+                    summary.roles_added += len(added)
+                    summary.roles_removed += len(removed)
+            except discord.Forbidden:
+                summary.errors += 1
+                SWEEP_ERRORS.inc()
+                logging.error(f'Missing permissions to modify roles for user {user_id}')
+            except Exception as e:
+                summary.errors += 1
+                SWEEP_ERRORS.inc()
+                logging.error(f'Error processing user {user_id}: {e}')
+
+            summary.users_processed += 1
+            SWEEP_USERS.inc()
+            step = max(1, summary.users_total // 10)
+            if summary.users_processed % step == 0:
+                logging.info(f'Sweep progress: {summary}')
+
+class QueuedSweepEngine:
+    """Hands reconciliation to --worker processes through the durable job queue
+
+    A sweep only enqueues one job per member, carrying the guild's holder
+    role IDs and the member's current holder roles, and returns at once.
+    watch_results() turns finished jobs into the same summaries, metrics and
+    logs as an inline sweep, so the interactive process never does the
+    upstream checks or role edits itself.
+    """
+
+    def __init__(self):
+        self.last: Optional[SweepSummary] = None
+        self.last_by_guild: Dict[int, SweepSummary] = {}
+        self._batches: Dict[str, SweepSummary] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._batches)
+
+    @property
+    def current(self) -> Optional[SweepSummary]:
+        return next(iter(self._batches.values()), None)
+
+    def current_for(self, guild_id: int) -> Optional[SweepSummary]:
+        return next((summary for summary in self._batches.values() if summary.guild_id == guild_id), None)
+
+    async def run(self, guild: discord.Guild, user_ids) -> Optional[SweepSummary]:
+        """Enqueue a job for every given member of the guild"""
+        managed = ManagedRoles.for_guild(guild)
+        role_ids = {slug: role.id for slug, role in managed.holder_roles.items()}
+        rules = [[rule.to_dict(), role.id] for rule, role in managed.rule_roles]
+        managed_ids = {role.id for role in managed.roles}
+        members = await sweep_members(guild, user_ids)
+        jobs = []
+        for user_id in user_ids:
+            member = members.get(int(user_id))
+            if member is None:
+                continue
+            current = [role.id for role in member.roles if role.id in managed_ids]
+            jobs.append((user_id, json.dumps({'roles': role_ids, 'rules': rules, 'current': current})))
+
+        batch = f'{guild.id}-{time.time():.3f}'
+        queued = await store.run(store.enqueue_sweep_jobs, batch, guild.id, jobs)
+        logging.info(f'Queued {queued} reconciliation jobs for {guild.name} '
+                     f'({len(jobs) - queued} already pending)')
+        if not queued:
+            return None
+        summary = SweepSummary(guild.id, queued)
+        self._batches[batch] = summary
+        SWEEP_RUNNING.set(1)
+        return summary
+
+    async def watch_results(self):
+        """Collect finished jobs from the workers, forever"""
+        while True:
+            try:
+                for job in await store.run(store.take_finished_sweep_jobs):
+                    await self._record(job)
+            except Exception as e:
+                logging.error(f'Error collecting sweep results: {e}')
+            await asyncio.sleep(SWEEP_POLL_INTERVAL)
+
+    async def _record(self, job: dict):
+        result = json.loads(job['result'] or '{}')
+        guild = bot.get_guild(job['guild_id'])
+        summary = self._batches.get(job['batch'])
+        SWEEP_USERS.inc()
+        if job['status'] == 'failed':
+            SWEEP_ERRORS.inc()
+            logging.error(f"Error processing user {job['user_id']}: {result.get('error')}")
+        elif not result.get('superseded'):
+            changed = bool(result.get('changed') or result.get('added') or result.get('removed'))
+            await check_schedule.record(job['guild_id'], job['user_id'], changed, result.get('held', []))
+            for action, role_ids in (('Added', result.get('added', [])), ('Removed', result.get('removed', []))):
+                for role_id in role_ids:
+                    role = guild.get_role(role_id) if guild is not None else None
+                    logging.info(f"{action} role {role.name if role else role_id} for user {job['user_id']}",
+                                 extra=AUDIT_LOG)
+        if summary is None:
+            return  # queued by an earlier run of the bot
+
+        summary.users_processed += 1
+        if job['status'] == 'failed':
+            summary.errors += 1
+        elif result.get('added') or result.get('removed'):
+            summary.members_changed += 1
+            summary.roles_added += len(result.get('added', []))
+            summary.roles_removed += len(result.get('removed', []))
+        if summary.users_processed >= summary.users_total:
+            summary.finished_at = time.time()
+            del self._batches[job['batch']]
+            self.last = self.last_by_guild[summary.guild_id] = summary
+            SWEEP_SECONDS.observe(summary.duration)
+            SWEEP_LAST_DURATION.set(summary.duration)
+            SWEEP_RUNNING.set(1 if self._batches else 0)
+            logging.info(f"Sweep of {guild.name if guild else summary.guild_id} finished: {summary}")
+
+if SWEEP_MODE == 'queue':
+    sweep_engine = QueuedSweepEngine()
+else:
+    sweep_engine = SweepEngine(SWEEP_CONCURRENCY)
+
 async def verify_all_wallets():
-    """Periodically verify all registered wallets and update roles"""
+    """Re-verify registered members as their scheduled checks come due
+
+    Every CHECK_TICK seconds the collection snapshots are refreshed (each at
+    most once per SNAPSHOT_TTL, shared by all guilds) and every configured
+    guild reconciles the members that are due. Members whose addresses show
+    up in a snapshot delta are made due at once, so a trade is picked up
+    within one refresh no matter how long the member's interval has grown.
+    """
+    # The guilds are only known once the gateway is ready; the jitter keeps
+    # restarts from hitting the upstreams in lockstep with the cache warm-up
+    request_priority.set(PRIORITY_BACKGROUND)
+    await bot.wait_until_ready()
+    await asyncio.sleep(random.uniform(0, SWEEP_START_JITTER))
+    refreshed_at: Dict[str, float] = {}
     while True:
+        started = time.monotonic()
         try:
-            logging.info('Starting periodic wallet verification...')
-            guild_id = int(os.getenv('GUILD_ID', '0'))
-            guild = bot.get_guild(guild_id)
-            
-            if not guild:
-                logging.error(f'Could not find guild with ID {guild_id}')
-                await asyncio.sleep(WALLET_CHECK_INTERVAL * 60)
-                continue
-                
-            user_data = load_user_data()
-            
-            for user_id, addresses in user_data.items():
-                try:
-                    member = await guild.fetch_member(int(user_id))
-                    if not member:
-                        logging.warning(f'Could not find member with ID {user_id}')
-                        continue
-                        
-                    logging.info(f'Checking addresses for user {member.name} ({user_id})')
-                    
-                    # Check each collection
-                    for collection_slug, role_name in COLLECTIONS.items():
-                        role = discord.utils.get(guild.roles, name=role_name)
-                        if not role:
-                            logging.warning(f'Could not find role {role_name}')
-                            continue
-                            
-                        # Check if user owns any Ordinals in collection
-                        has_ordinal = False
-                        for address in addresses:
-                            owns, count, _ = await verify_ownership(address, collection_slug)
-                            if owns and count > 0:
-                                has_ordinal = True
-                                break
-                                
-                        # Update role
-                        try:
-                            if has_ordinal and role not in member.roles:
-                                await member.add_roles(role)
-                                logging.info(f'Added role {role_name} to {member.name}')
-                            elif not has_ordinal and role in member.roles:
-                                await member.remove_roles(role)
-                                logging.info(f'Removed role {role_name} from {member.name}')
-                        except discord.Forbidden:
-                            logging.error(f'Missing permissions to modify roles for {member.name}')
-                        except Exception as e:
-                            logging.error(f'Error updating roles for {member.name}: {e}')
-                            
-                except Exception as e:
-                    logging.error(f'Error processing user {user_id}: {e}')
-                    
-                # Sleep briefly between users to avoid rate limits
-                await asyncio.sleep(1)
-                
-            logging.info('Finished periodic wallet verification')
-            
+            # Refresh the snapshots that expired; changed holders are queued as deltas
+            for collection_slug in sorted(guild_collections.slugs()):
+                await snapshot_cache.get(collection_slug)
+            deltas = snapshot_cache.drain_deltas()
+            overflowed = snapshot_cache.deltas_overflowed
+            snapshot_cache.deltas_overflowed = False
+
+            for collection_slug in guild_collections.slugs():
+                snapshot = snapshot_cache.peek(collection_slug)
+                if snapshot is None or refreshed_at.get(collection_slug) == snapshot.fetched_at:
+                    continue
+                refreshed_at[collection_slug] = snapshot.fetched_at
+                changed = sum(len(delta.wallets) for delta in deltas if delta.slug == collection_slug)
+                check_schedule.note_refresh(collection_slug, changed, len(snapshot.holders))
+
+            for guild in bot.guilds:
+                slugs = guild_collections.get(guild.id)
+                if not slugs:
+                    continue
+                await sweep_guild(guild, slugs, deltas, overflowed)
+
         except Exception as e:
             logging.error(f'Error in verify_all_wallets: {e}')
-            
-        # Wait for next check interval
-        await asyncio.sleep(WALLET_CHECK_INTERVAL * 60)
+
+        await asyncio.sleep(max(0, CHECK_TICK - (time.monotonic() - started)))
+
+async def sweep_guild(guild: discord.Guild, slugs: Dict[str, str], deltas: List['SnapshotDelta'], overflowed: bool):
+    """Reconcile the members of one guild whose check is due"""
+    # Registered users span every guild; only this guild's members are scheduled in it
+    user_ids = address_registry.user_ids()
+    in_guild = await member_ids(guild)
+    if in_guild is not None:
+        user_ids = [user_id for user_id in user_ids if int(user_id) in in_guild]
+    await check_schedule.ensure(guild.id, user_ids)
+
+    registered = set(user_ids)
+    affected = set()
+    changed_wallets = set()
+    for delta in deltas:
+        if delta.slug in slugs:
+            changed_wallets |= delta.wallets
+    if changed_wallets:
+        affected = address_registry.users_for(changed_wallets) & registered
+        await check_schedule.expedite(guild.id, affected)
+        CHECKS_EXPEDITED.inc(len(affected))
+        logging.info(f'{len(changed_wallets)} wallets changed in the collections of {guild.name}, '
+                     f'checking {len(affected)} members now')
+    if overflowed:
+        # Deltas were dropped, so any member may have changed; spread a recheck over a few ticks
+        await check_schedule.expedite(guild.id, registered, within=CHECK_TICK * 10)
+        logging.info(f'Snapshot deltas overflowed, rechecking all {len(registered)} members of {guild.name}')
+
+    # At most twice the steady-state rate per tick, so a backlog after downtime drains without a burst;
+    # members touched by a delta come on top of that
+    steady = len(registered) * CHECK_TICK / (WALLET_CHECK_INTERVAL * 60)
+    due = check_schedule.due(guild.id, max(SWEEP_CONCURRENCY, math.ceil(2 * steady)) + len(affected))
+    gone = [user_id for user_id in due if user_id not in registered]
+    if gone:
+        await check_schedule.forget(guild.id, gone)
+    due = [user_id for user_id in due if user_id in registered]
+    if not due:
+        return
+    logging.debug(f'Reconciling {len(due)} members of {guild.name} that are due')
+    await check_schedule.dispatched(guild.id, due)
+    await sweep_engine.run(guild, due)
+
+@bot.tree.command(name="cache_stats", description="Show snapshot and Magic Eden cache statistics (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def cache_stats(interaction: discord.Interaction):
+    msg = "**Snapshots (shared by all servers):**\n"
+    for slug in sorted(guild_collections.slugs()):
+        snapshot = snapshot_cache.peek(slug)
+        if snapshot is None:
+            msg += f"• {slug}: not loaded\n"
+        else:
+            source = " (mapped from disk)" if isinstance(snapshot.holders, MappedHolders) else ""
+            msg += f"• {slug}: {len(snapshot.holders)} holders, {snapshot.age:.0f}s old{source}\n"
+    msg += (
+        f"\n**Magic Eden bios:** {bio_cache.hits} hits, {bio_cache.misses} misses "
+        f"({bio_cache.hit_rate:.0%} hit rate)"
+    )
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="sweep_status", description="Show progress of the periodic role sweep (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def sweep_status(interaction: discord.Interaction):
+    current = sweep_engine.current_for(interaction.guild.id)
+    if current is not None:
+        msg = f"🔄 Sweep running ({current.progress:.0%}): {current}"
+    elif sweep_engine.running:
+        msg = "⏳ Another server is being swept; this one is queued."
+    else:
+        msg = "⏸️ No sweep running."
+    last = sweep_engine.last_by_guild.get(interaction.guild.id)
+    if last is not None:
+        msg += f"\nLast sweep: {last}"
+    scheduled, due, median = check_schedule.stats(interaction.guild.id)
+    msg += f"\nSchedule: {scheduled} members, {due} due now, median interval {median / 60:.0f} min"
+    active = check_schedule.active_collections() & guild_collections.get(interaction.guild.id).keys()
+    if active:
+        msg += f"\nActively trading: {', '.join(sorted(active))}"
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="collections", description="List this server's collection roles (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def list_collections(interaction: discord.Interaction):
+    configured = guild_collections.get(interaction.guild.id)
+    if not configured:
+        await interaction.response.send_message(
+            "❌ No collections configured yet. Add one with /set_collection.", ephemeral=True)
+        return
+
+    msg = "**Collection roles:**\n"
+    for slug, role_name in sorted(configured.items()):
+        found = discord.utils.get(interaction.guild.roles, name=role_name) is not None
+        msg += f"• `{slug}` → {role_name}{'' if found else ' (role missing, run /setup_roles)'}\n"
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="set_collection", description="Give holders of a BestInSlot collection a role (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def set_collection(interaction: discord.Interaction, slug: str, role_name: str):
+    slug = slug.strip().lower()
+    role_name = role_name.strip()
+    if not is_collection_slug(slug):
+        await interaction.response.send_message(
+            "❌ Collection slugs may only contain lowercase letters, digits and dashes.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+
+    # Loading the snapshot both validates the slug and warms the shared cache
+    snapshot = await snapshot_cache.get(slug)
+    if snapshot is None:
+        await interaction.followup.send(f"❌ Could not load a BestInSlot snapshot for `{slug}`.", ephemeral=True)
+        return
+
+    await guild_collections.set(interaction.guild.id, slug, role_name)
+    msg = f"✅ Holders of `{slug}` ({len(snapshot.holders)} wallets) will get **{role_name}**."
+    if discord.utils.get(interaction.guild.roles, name=role_name) is None:
+        msg += "\nThe role doesn't exist yet, run /setup_roles to create it."
+    await interaction.followup.send(msg, ephemeral=True)
+
+@bot.tree.command(name="remove_collection", description="Stop giving roles for a collection (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def remove_collection(interaction: discord.Interaction, slug: str):
+    slug = slug.strip().lower()
+    if not await guild_collections.remove(interaction.guild.id, slug):
+        await interaction.response.send_message(f"❌ `{slug}` is not configured for this server.", ephemeral=True)
+        return
+    await role_rules.remove_collection(interaction.guild.id, slug)
+    await interaction.response.send_message(
+        f"✅ Removed `{slug}`. Existing roles are left in place.", ephemeral=True)
+
+@bot.tree.command(name="rules", description="List this server's role rules (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def list_rules(interaction: discord.Interaction):
+    rules = role_rules.get(interaction.guild.id)
+    if not rules:
+        await interaction.response.send_message(
+            "No role rules yet. Add tiered or specific-inscription roles with /add_rule.", ephemeral=True)
+        return
+
+    msg = "**Role rules:**\n"
+    for rule in rules:
+        msg += f"• **{rule.role_name}**: {rule.describe()}"
+        snapshot = snapshot_cache.peek(rule.slug)
+        if snapshot is not None and not rule.inscription_ids:
+            msg += f" ({snapshot.holders_with_at_least(rule.min_count)} single wallets hold that many)"
+        if discord.utils.get(interaction.guild.roles, name=rule.role_name) is None:
+            msg += " (role missing, run /setup_roles)"
+        msg += "\n"
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="add_rule", description="Give a role for holding enough or specific inscriptions (Requires Manage Roles)")
+@app_commands.describe(
+    slug="Collection the rule looks at; must already be configured with /set_collection",
+    min_count="Inscriptions needed across all of a member's wallets, or how many of the listed inscriptions",
+    inscriptions="Comma-separated inscription IDs, e.g. the 1/1s or every inscription with a trait"
+)
+@app_commands.checks.has_permissions(manage_roles=True)
+async def add_rule(interaction: discord.Interaction, role_name: str, slug: str, min_count: int = 1,
+                   inscriptions: Optional[str] = None):
+    role_name = role_name.strip()
+    slug = slug.strip().lower()
+    if slug not in guild_collections.get(interaction.guild.id):
+        await interaction.response.send_message(
+            f"❌ `{slug}` is not configured for this server, add it with /set_collection first.", ephemeral=True)
+        return
+    inscription_ids = list(dict.fromkeys(
+        normalize_inscription_id(inscription_id) for inscription_id in (inscriptions or '').split(',')
+        if inscription_id.strip()
+    ))
+    if min_count < 1 or (inscription_ids and min_count > len(inscription_ids)):
+        await interaction.response.send_message("❌ min_count must be between 1 and the number of listed inscriptions.",
+                                                ephemeral=True)
+        return
+
+    rule = RoleRule(role_name, slug, min_count, inscription_ids)
+    await role_rules.set(interaction.guild.id, rule)
+    msg = f"✅ **{role_name}** now goes to holders of {rule.describe()}."
+    if discord.utils.get(interaction.guild.roles, name=role_name) is None:
+        msg += "\nThe role doesn't exist yet, run /setup_roles to create it."
+    await interaction.response.send_message(msg, ephemeral=True)
+
+@bot.tree.command(name="remove_rule", description="Stop giving a rule role (Requires Manage Roles)")
+@app_commands.checks.has_permissions(manage_roles=True)
+async def remove_rule(interaction: discord.Interaction, role_name: str):
+    if not await role_rules.remove(interaction.guild.id, role_name.strip()):
+        await interaction.response.send_message(f"❌ No rule gives **{role_name}**.", ephemeral=True)
+        return
+    await interaction.response.send_message(
+        f"✅ Removed the rule for **{role_name}**. Existing roles are left in place.", ephemeral=True)
 
 @bot.tree.command(name="setup_verification", description="Setup verification message with buttons (Requires Manage Channels)")
 @app_commands.checks.has_permissions(manage_channels=True)
@@ -268,12 +1281,50 @@ async def setup_verification(interaction: discord.Interaction):
             ephemeral=True
         )
 
+async def warm_snapshot_caches():
+    """Load every collection snapshot in the background so the first Verify doesn't wait for it"""
+    request_priority.set(PRIORITY_BACKGROUND)
+    await asyncio.gather(*(snapshot_cache.get(slug) for slug in guild_collections.slugs()))
+    startup.mark('caches_warm')
+
+async def sync_commands(guild: Optional[discord.Object]):
+    """Sync the command tree without holding up the gateway connection
+
+    Commands registered by the previous run stay usable while this runs.
+    """
+    logging.info('Syncing commands...')
+    try:
+        if guild:
+            synced = await bot.tree.sync(guild=guild)
+        else:
+            synced = await bot.tree.sync()
+        logging.info(f'Commands synced successfully! Synced {len(synced)} commands:')
+        for cmd in synced:
+            logging.info(f'  - {cmd.name}')
+        startup.mark('command_sync')
+    except discord.errors.Forbidden as e:
+        logging.error(f'Failed to sync commands: {e}. Check bot permissions.')
+    except Exception as e:
+        logging.error(f'Failed to sync commands: {e}', exc_info=True)
+
 @bot.event
 async def setup_hook():
     logging.info('Setting up bot...')
-    
-    # Start periodic wallet verification
+    startup.mark('login')
+
+    # Buttons on messages sent by earlier runs keep working after a restart
+    bot.add_view(VerificationView())
+    bot.add_view(CommandView())
+
+    # Background work: warm the caches now, sweep once the guild is available
+    bot.loop.create_task(warm_snapshot_caches())
     bot.loop.create_task(verify_all_wallets())
+    if isinstance(sweep_engine, QueuedSweepEngine):
+        bot.loop.create_task(sweep_engine.watch_results())
+    try:
+        await start_metrics_server()
+    except OSError as e:
+        logging.error(f'Could not start metrics server on port {METRICS_PORT}: {e}')
     try:
         guild_id = os.getenv('GUILD_ID', '0')
         if guild_id == '0' or not guild_id.isdigit():
@@ -296,24 +1347,13 @@ async def setup_hook():
             else:
                 bot.tree.add_command(cmd)
         
-        logging.info('Syncing commands...')
-        try:
-            if MY_GUILD:
-                synced = await bot.tree.sync(guild=MY_GUILD)
-            else:
-                synced = await bot.tree.sync()
-            logging.info(f'Commands synced successfully! Synced {len(synced)} commands:')
-            for cmd in synced:
-                logging.info(f'  - {cmd.name}')
-        except discord.errors.Forbidden as e:
-            logging.error(f'Failed to sync commands: {e}. Check bot permissions.')
-        except Exception as e:
-            logging.error(f'Failed to sync commands: {e}', exc_info=True)
+        bot.loop.create_task(sync_commands(MY_GUILD))
     except Exception as e:
         logging.error(f'Failed in setup_hook: {e}', exc_info=True)
 
 @bot.event
 async def on_ready():
+    startup.mark('ready')
     logging.info(f'{bot.user} has connected to Discord!')
     logging.info('Connected to the following guilds:')
     for guild in bot.guilds:
@@ -360,12 +1400,8 @@ async def on_ready():
     logging.info('------')
 
 @bot.event
-async def on_message(message):
-    if message.author == bot.user:
-        return
-    
-    print(f'Message received from {message.author}: {message.content}')
-    await bot.process_commands(message)
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    observe_interaction(interaction, command.name)
 
 @bot.tree.command(name="ping", description="Test if the bot is responding")
 async def ping(interaction: discord.Interaction):
@@ -374,51 +1410,61 @@ async def ping(interaction: discord.Interaction):
 @bot.tree.command(name="add_address", description="Add a wallet address for verification")
 async def add_address(interaction: discord.Interaction, address: str):
     user_id = str(interaction.user.id)
+    address = address.strip()
     
-    # Initialize user's address list if not exists
-    if user_id not in user_addresses:
-        user_addresses[user_id] = []
-    
-    # Check if address already exists
-    if address in user_addresses[user_id]:
-        await interaction.response.send_message("❌ This address is already registered!", ephemeral=True)
-        return
-    
-    # Add the new address
-    user_addresses[user_id].append(address)
-    await interaction.response.send_message(f"✅ Added address: {address}", ephemeral=True)
-    await verify(interaction)
+    # Add the new address unless it already exists
+    added = await address_registry.add(user_id, address)
+    msg = f"✅ Added address: {address}" if added else "❌ This address is already registered!"
+
+    # The Add Address modal defers before checking the bio, so reply as a followup then
+    if not interaction.response.is_done():
+        await interaction.response.send_message(msg, ephemeral=True)
+    else:
+        await interaction.followup.send(msg, ephemeral=True)
+    if added:
+        await run_verification(interaction, use_cached=False)
 
 @bot.tree.command(name="remove_address", description="Remove a wallet address")
 async def remove_address(interaction: discord.Interaction, address: str):
     user_id = str(interaction.user.id)
+    address = address.strip()
     
-    if user_id not in user_addresses or address not in user_addresses[user_id]:
+    if not await address_registry.remove(user_id, address):
         await interaction.response.send_message("❌ This address is not registered!", ephemeral=True)
         return
     
-    user_addresses[user_id] = [addr for addr in user_addresses[user_id] if addr != address]
     await interaction.response.send_message(f"✅ Removed address: {address}", ephemeral=True)
-    await verify(interaction)
+    await run_verification(interaction, use_cached=False)
 
 @bot.tree.command(name="list_addresses", description="List all your registered wallet addresses")
 async def list_addresses(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
+    addresses = get_user_addresses(user_id)
     
-    if user_id not in user_addresses or not user_addresses[user_id]:
+    if not addresses:
         await interaction.response.send_message("❌ You have no registered addresses!", ephemeral=True)
         return
     
-    addresses = get_user_addresses(user_id)
     formatted_addresses = "\n".join([f"{i+1}. {addr}" for i, addr in enumerate(addresses)])
     await interaction.response.send_message(f"Your linked addresses:\n```{formatted_addresses}```", ephemeral=True)
 
 def get_user_addresses(user_id: str) -> List[str]:
     """Get list of addresses for a user"""
-    return user_addresses.get(user_id, [])
+    return address_registry.get(user_id)
 
 @bot.tree.command(name="verify", description="Verify Ordinal ownership and assign roles")
 async def verify(interaction: discord.Interaction):
+    await run_verification(interaction)
+
+async def run_verification(interaction: discord.Interaction, use_cached: bool = True):
+    """Answer at once from the member's last-known holdings, then refresh them in the background
+
+    The answer is labelled with the age of the data it was built from. The
+    refresh checks the snapshots live, updates roles and edits the answer only
+    if the fresh result reads differently, so a slow BestInSlot never holds up
+    the reply. use_cached=False answers with a placeholder instead, for when
+    the member's addresses just changed.
+    """
     if not interaction.guild:
         if not interaction.response.is_done():
             await interaction.response.send_message("❌ This command can only be used in a server!", ephemeral=True)
@@ -427,9 +1473,9 @@ async def verify(interaction: discord.Interaction):
         return
 
     user_id = str(interaction.user.id)
-    if user_id not in user_addresses or not user_addresses[user_id]:
+    if not get_user_addresses(user_id):
         # Get the user's verification code to display
-        verification_code = await get_user_verification_code(user_id)
+        verification_code = get_user_verification_code(user_id)
         
         class NoAddressView(discord.ui.View):
             def __init__(self):
@@ -452,82 +1498,114 @@ async def verify(interaction: discord.Interaction):
             await interaction.followup.send(message, view=NoAddressView(), ephemeral=True)
         return
 
+    addresses = get_user_addresses(user_id)
+    managed = ManagedRoles.for_guild(interaction.guild)
+    cached_body = None
+    cached_at = None
+    msg = "🔍 Checking your wallets, this message will update in a moment..."
+    if use_cached:
+        holdings, cached_at = store.load_holdings(user_id, managed.slugs)
+        if cached_at is not None:
+            cached_body = format_verification(managed, holdings, managed.evaluate(addresses, holdings))
+            msg = (f"{cached_body}\n\n🕒 As of your last check {format_age(time.time() - cached_at)} ago. "
+                   "Checking again now; this message updates if anything changed.")
+
     if not interaction.response.is_done():
-        await interaction.response.send_message("Starting verification process... Please wait.", ephemeral=True)
+        await interaction.response.send_message(msg, ephemeral=True)
+        edit = interaction.edit_original_response
     else:
-        await interaction.followup.send("Starting verification process... Please wait.", ephemeral=True)
-    user_id = str(interaction.user.id)
-    addresses = get_user_addresses(user_id)
-    
-    if not addresses:
-        await interaction.followup.send("❌ Please add your wallet address first using /add_address", ephemeral=True)
-        return
-    
-    verified_collections = []
-    roles_added = []
-    roles_error = []
-    holdings = {}
-    
-    # Check each collection
-    for slug, role_name in COLLECTIONS.items():
-        role = discord.utils.get(interaction.guild.roles, name=role_name)
-        if not role:
-            logging.warning(f"Role not found: {role_name}")
-            continue
-            
-        logging.info(f"Checking role {role_name} (position {role.position})")
-        user_has_role = role in interaction.user.roles
-        owns_ordinal = False
-        max_count = 0
-        collection_inscriptions = None
-        
-        for addr in addresses:
-            is_holder, count, inscriptions = await verify_ownership(addr, slug)
-            if is_holder and count is not None:  # Make sure we have valid count data
-                owns_ordinal = True
-                if count > max_count:
-                    max_count = count
-                    collection_inscriptions = inscriptions
-                if not user_has_role:
-                    try:
-                        await interaction.user.add_roles(role)
-                        roles_added.append(role_name)
-                        logging.info(f"Added role {role_name} to user")
-                    except discord.Forbidden as e:
-                        logging.error(f"Failed to add role {role_name}: {e}")
-                        roles_error.append(role_name)
-                break
-        
-        if owns_ordinal:
-            verified_collections.append(slug)
-            holdings[slug] = (max_count, collection_inscriptions)
-        elif user_has_role:
-            try:
-                await interaction.user.remove_roles(role)
-                logging.info(f"Removed role {role_name} from user")
-            except discord.Forbidden as e:
-                logging.error(f"Failed to remove role {role_name}: {e}")
-                roles_error.append(role_name)
-    
-    # Prepare response message
+        message = await interaction.followup.send(msg, ephemeral=True, wait=True)
+        edit = message.edit
+
+    task = asyncio.create_task(refresh_verification(interaction, edit, managed, addresses, cached_body, cached_at))
+    verification_refreshes.add(task)
+    task.add_done_callback(verification_refreshes.discard)
+    interaction.extras['verification_refresh'] = task
+
+# Background refreshes of Verify answers, kept referenced until they finish
+verification_refreshes: Set[asyncio.Task] = set()
+
+def format_age(seconds: float) -> str:
+    """Render a duration as a short human-readable age"""
+    if seconds < 90:
+        return f"{max(1, round(seconds))}s"
+    if seconds < 90 * 60:
+        return f"{round(seconds / 60)} min"
+    if seconds < 36 * 3600:
+        return f"{round(seconds / 3600)} h"
+    return f"{round(seconds / 86400)} days"
+
+def format_verification(managed: ManagedRoles, holdings: Dict[str, Tuple[int, Optional[str]]], desired: Set[discord.Role],
+                        roles_added: List[str] = (), roles_error: List[str] = ()) -> str:
+    """Render the Verify answer for a member's holdings"""
+    verified_collections = [slug for slug in managed.holder_roles if slug in holdings]
     if verified_collections:
         msg = "✅ Verification successful!\n\n"
         if roles_added:
             msg += f"Added roles: {', '.join(roles_added)}\n\n"
-        
+
         msg += "Your holdings:\n"
         for slug in verified_collections:
             count, inscriptions = holdings[slug]
-            collection_name = COLLECTIONS[slug].replace(' Holder', '')
+            collection_name = managed.holder_roles[slug].name.replace(' Holder', '')
             msg += f"• {collection_name}: {count} inscription{'s' if count != 1 else ''}\n"
+        earned = [role.name for rule, role in managed.rule_roles if role in desired]
+        if earned:
+            msg += f"\nEarned roles: {', '.join(earned)}\n"
     else:
         msg = "❌ No Ordinals found in the verified collections."
-    
+
     if roles_error:
         msg += f"\n⚠️ Bot couldn't manage these roles: {', '.join(roles_error)}"
         msg += "\nPlease check the bot's permissions and role hierarchy."
-    
-    await interaction.followup.send(msg, ephemeral=True)
+    return msg
+
+async def refresh_verification(interaction: discord.Interaction, edit, managed: ManagedRoles, addresses: List[str],
+                               cached_body: Optional[str], cached_at: Optional[float]):
+    """Check a member's wallets live, then update their roles and Verify answer if anything changed
+
+    If the check fails, the answer is edited to say so, so a cached answer
+    is never left claiming to have been rechecked.
+    """
+    user_id = str(interaction.user.id)
+    try:
+        holdings = await collect_holdings(addresses, managed.slugs)
+        changed = await store.run(store.save_holdings, user_id, holdings, managed.slugs)
+        await check_schedule.record(interaction.guild.id, user_id, changed, holdings)
+        desired = managed.evaluate(addresses, holdings)
+
+        roles_added = []
+        roles_error = []
+        try:
+            added, removed = await apply_holder_roles(interaction.user, managed, desired)
+            roles_added = [role.name for role in added]
+            for role in added:
+                logging.info(f"Added role {role.name} to user", extra=AUDIT_LOG)
+            for role in removed:
+                logging.info(f"Removed role {role.name} from user", extra=AUDIT_LOG)
+        except discord.Forbidden as e:
+            logging.error(f"Failed to update holder roles: {e}")
+            roles_error = [
+                role.name for role in managed.roles
+                if (role in desired) != (role in interaction.user.roles)
+            ]
+
+        msg = format_verification(managed, holdings, desired, roles_added, roles_error)
+        if msg != cached_body:
+            await edit(content=msg)
+        if not roles_error:
+            startup.mark('first_verify')
+    except Exception as e:
+        logging.error(f"Error refreshing verification for user {user_id}: {e}")
+        if cached_body is None:
+            msg = "❌ Couldn't check your wallets right now, please try again in a minute."
+        else:
+            msg = (f"{cached_body}\n\n⚠️ As of your last check {format_age(time.time() - cached_at)} ago. "
+                   "Checking again failed, so this may be out of date; please try again in a minute.")
+        try:
+            await edit(content=msg)
+        except discord.HTTPException:
+            pass
 
 @bot.tree.command(name="setup_roles", description="Create missing roles (Requires Manage Roles permission)")
 @app_commands.checks.has_permissions(manage_roles=True)
@@ -535,8 +1613,10 @@ async def setup_roles(interaction: discord.Interaction):
     roles_created = []
     roles_existing = []
     
-    # Check collection roles
-    for role_name in COLLECTIONS.values():
+    # Check collection and rule roles
+    role_names = [*guild_collections.get(interaction.guild.id).values(),
+                  *(rule.role_name for rule in role_rules.get(interaction.guild.id))]
+    for role_name in dict.fromkeys(role_names):
         role = discord.utils.get(interaction.guild.roles, name=role_name)
         if not role:
             await interaction.guild.create_role(name=role_name)
@@ -544,31 +1624,23 @@ async def setup_roles(interaction: discord.Interaction):
         else:
             roles_existing.append(role_name)
     
-    # Check booster role
-    booster_role = discord.utils.get(interaction.guild.roles, name=BOOSTER_ROLE_NAME)
-    if not booster_role:
-        await interaction.guild.create_role(
-            name=BOOSTER_ROLE_NAME,
-            color=discord.Color.from_rgb(244, 127, 255),  # Pink color
-            reason="Role for server boosters"
-        )
-        roles_created.append(BOOSTER_ROLE_NAME)
-    else:
-        roles_existing.append(BOOSTER_ROLE_NAME)
-    
     msg = ""
     
     if roles_created:
         msg += f"✅ Created roles: {', '.join(roles_created)}\n"
     if roles_existing:
         msg += f"ℹ️ Existing roles: {', '.join(roles_existing)}"
+    if not msg:
+        msg = "❌ No collections configured yet. Add one with /set_collection."
     
     await interaction.response.send_message(msg, ephemeral=True)
 
 @bot.tree.command(name="check_roles", description="Check which collection roles you currently have")
 async def check_roles(interaction: discord.Interaction):
     user_roles = [role.name for role in interaction.user.roles]
-    verified_roles = [role for role in COLLECTIONS.values() if role in user_roles]
+    role_names = [*guild_collections.get(interaction.guild.id).values(),
+                  *(rule.role_name for rule in role_rules.get(interaction.guild.id))]
+    verified_roles = [role for role in dict.fromkeys(role_names) if role in user_roles]
     
     msg = ""
     
@@ -580,18 +1652,229 @@ async def check_roles(interaction: discord.Interaction):
     else:
         msg += "You don't have any collection roles yet!\n"
     
-    # Check booster status
-    if BOOSTER_ROLE_NAME in user_roles:
-        msg += "\n⭐ You are a server booster! Thank you for your support!"
-    
     await interaction.response.send_message(msg, ephemeral=True)
 
-# Rate limiting setup
-request_times = deque()
+# Priority scheduling for shared budgets
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+# Priority of upstream calls and role edits made by the current task; sweeps,
+# cache warm-up and workers switch to background
+request_priority: contextvars.ContextVar[str] = contextvars.ContextVar('request_priority', default=PRIORITY_INTERACTIVE)
+
+class PriorityWaiters:
+    """Per-priority FIFO queues of callers waiting for a shared resource
+
+    Interactive callers are served first, but while both classes are waiting
+    at least ``min_background_share`` of the grants go to background work, so
+    a steady stream of users can't starve the sweep.
+    """
+
+    def __init__(self, name: str, min_background_share: float):
+        self.name = name
+        self.min_background_share = min(1.0, max(0.0, min_background_share))
+        self._queues: Dict[str, deque] = {PRIORITY_INTERACTIVE: deque(), PRIORITY_BACKGROUND: deque()}
+        self._background_credit = 0.0
+
+    def __bool__(self) -> bool:
+        return any(self._queues.values())
+
+    def add(self, priority: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(future)
+        self._report(priority)
+        return future
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """Next waiter to serve, skipping ones that gave up"""
+        for queue in self._queues.values():
+            while queue and queue[0].done():
+                queue.popleft()
+        interactive, background = self._queues[PRIORITY_INTERACTIVE], self._queues[PRIORITY_BACKGROUND]
+        if interactive and background:
+            self._background_credit += self.min_background_share
+            if self._background_credit >= 1:
+                self._background_credit -= 1
+                priority = PRIORITY_BACKGROUND
+            else:
+                priority = PRIORITY_INTERACTIVE
+        elif interactive or background:
+            priority = PRIORITY_INTERACTIVE if interactive else PRIORITY_BACKGROUND
+        else:
+            return None
+        future = self._queues[priority].popleft()
+        self._report(priority)
+        return future
+
+    def _report(self, priority: str):
+        SCHEDULER_QUEUE_DEPTH.set(len(self._queues[priority]), resource=self.name, priority=priority)
+
+    async def wait(self, future: asyncio.Future, on_abandoned_grant=None):
+        """Wait for a grant; if the caller is cancelled after being granted, give the grant back"""
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                if on_abandoned_grant is not None:
+                    on_abandoned_grant()
+            else:
+                for priority, queue in self._queues.items():
+                    if future in queue:
+                        queue.remove(future)
+                        self._report(priority)
+            raise
+
+class TokenBucket:
+    """Async token bucket limiting the request rate to one upstream host
+
+    Waiting callers are served by priority (see PriorityWaiters) and FIFO
+    within a class, so concurrent callers can't slip past the limit together.
+    A 429 empties the bucket and blocks it until the upstream's Retry-After
+    has passed.
+    """
+
+    def __init__(self, name: str, rate_per_minute: int, burst: int,
+                 min_background_share: float = BACKGROUND_MIN_SHARE):
+        if rate_per_minute <= 0:
+            raise ValueError(f"{name} rate limit must be positive, got {rate_per_minute} per minute")
+        self.name = name
+        self.rate = rate_per_minute / RATE_LIMIT_WINDOW  # tokens per second
+        self.capacity = max(1, burst)
+        self.total_wait = 0.0
+        self.acquired = 0
+        self.throttled = 0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = PriorityWaiters(name, min_background_share)
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        if now >= self._blocked_until and self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self) -> float:
+        """Wait for a token and return how many seconds the caller waited"""
+        priority = request_priority.get()
+        started = time.monotonic()
+        if self._waiters or not self._take():
+            future = self._waiters.add(priority)
+            if self._dispatcher is None or self._dispatcher.done():
+                self._dispatcher = asyncio.create_task(self._dispatch())
+            await self._waiters.wait(future, on_abandoned_grant=self._give_back)
+        waited = time.monotonic() - started
+        SCHEDULER_WAIT_SECONDS.observe(waited, resource=self.name, priority=priority)
+        self.acquired += 1
+        self.total_wait += waited
+        return waited
+
+    def _give_back(self):
+        """Return the token of a waiter cancelled between its grant and resuming"""
+        self._refill(time.monotonic())
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+    async def _dispatch(self):
+        """Hand out tokens to waiters as they become available"""
+        while self._waiters:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+            elif self._tokens >= 1:
+                future = self._waiters.pop()
+                if future is not None:
+                    self._tokens -= 1
+                    future.set_result(None)
+            else:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self, delay: float):
+        """Stop handing out tokens for ``delay`` seconds after the upstream throttled us"""
+        self.throttled += 1
+        self._tokens = 0.0
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+class PrioritySemaphore:
+    """Caps concurrent operations, handing freed slots out by priority"""
+
+    def __init__(self, name: str, slots: int, min_background_share: float = BACKGROUND_MIN_SHARE):
+        self.name = name
+        self._free = max(1, slots)
+        self._waiters = PriorityWaiters(name, min_background_share)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        priority = request_priority.get()
+        started = time.monotonic()
+        if self._waiters or not self._free:
+            await self._waiters.wait(self._waiters.add(priority), on_abandoned_grant=self._release)
+        else:
+            self._free -= 1
+        SCHEDULER_WAIT_SECONDS.observe(time.monotonic() - started, resource=self.name, priority=priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        future = self._waiters.pop()
+        if future is not None:
+            future.set_result(None)  # the slot passes straight to the next waiter
+        else:
+            self._free += 1
+
+role_edit_scheduler = PrioritySemaphore('discord_role_edits', ROLE_EDIT_CONCURRENCY)
+
+bestinslot_limiter = TokenBucket('bestinslot', BESTINSLOT_RATE_LIMIT_QPM, BESTINSLOT_RATE_LIMIT_BURST)
+magiceden_limiter = TokenBucket('magiceden', MAGICEDEN_RATE_LIMIT_QPM, MAGICEDEN_RATE_LIMIT_BURST)
+
+# Shared upstream HTTP session, created lazily inside the running event loop
+http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the pooled keep-alive session used for all BestInSlot and Magic Eden calls"""
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=60
+        )
+        http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, sock_connect=10),
+            headers={'Accept-Encoding': 'gzip, deflate'}
+        )
+    return http_session
+
+async def close_http_session():
+    """Close the shared HTTP session and its pooled connections"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
 
 # Ensure data directory exists
 os.makedirs('data', exist_ok=True)
 
+def normalize_address(address: str) -> str:
+    """Normalize a wallet address for comparisons and index lookups"""
+    return address.strip().lower()
+
+COLLECTION_SLUG = re.compile(r'[a-z0-9-]+')  # BestInSlot slugs; also used in snapshot file names
+
+def is_collection_slug(slug: str) -> bool:
+    """Whether a string is a well-formed collection slug, safe to use in URLs and file names"""
+    return COLLECTION_SLUG.fullmatch(slug) is not None
+
 def load_user_data():
     """Load user address mappings from file"""
     if os.path.exists(USER_DATA_FILE):
@@ -599,12 +1882,625 @@ def load_user_data():
             return json.load(f)
     return {}
 
-def save_user_data(data):
-    """Save user address mappings to file"""
-    with open(USER_DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+class Store:
+    """SQLite (WAL) store for addresses, verification codes and last-known holdings
+
+    Every write is a small indexed transaction rather than a rewrite of a
+    whole JSON file, and the interactive commands and the sweep share it.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS user_addresses (
+            user_id TEXT NOT NULL,
+            address TEXT NOT NULL,
+            normalized TEXT NOT NULL,
+            added_at REAL NOT NULL,
+            PRIMARY KEY (user_id, normalized)
+        );
+        CREATE INDEX IF NOT EXISTS user_addresses_by_address ON user_addresses (normalized);
+        CREATE TABLE IF NOT EXISTS verification_codes (
+            user_id TEXT PRIMARY KEY,
+            code TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS holdings (
+            user_id TEXT NOT NULL,
+            slug TEXT NOT NULL,
+            inscriptions_count INTEGER NOT NULL,
+            inscriptions TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (user_id, slug)
+        );
+        CREATE TABLE IF NOT EXISTS holdings_checked (
+            user_id TEXT NOT NULL,
+            slug TEXT NOT NULL,
+            checked_at REAL NOT NULL,
+            PRIMARY KEY (user_id, slug)
+        );
+        CREATE TABLE IF NOT EXISTS guild_collections (
+            guild_id INTEGER NOT NULL,
+            slug TEXT NOT NULL,
+            role_name TEXT NOT NULL,
+            PRIMARY KEY (guild_id, slug)
+        );
+        CREATE TABLE IF NOT EXISTS sweep_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch TEXT NOT NULL,
+            guild_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            claimed_at REAL,
+            result TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sweep_jobs_by_status ON sweep_jobs (status, id);
+        CREATE UNIQUE INDEX IF NOT EXISTS sweep_jobs_pending ON sweep_jobs (guild_id, user_id)
+            WHERE status = 'queued';
+        CREATE TABLE IF NOT EXISTS role_rules (
+            guild_id INTEGER NOT NULL,
+            role_name TEXT NOT NULL,
+            slug TEXT NOT NULL,
+            min_count INTEGER NOT NULL,
+            inscription_ids TEXT NOT NULL,
+            PRIMARY KEY (guild_id, role_name)
+        );
+        CREATE TABLE IF NOT EXISTS check_schedule (
+            guild_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            next_check REAL NOT NULL,
+            interval REAL NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    async def run(self, method, *args):
+        """Call a store method on a worker thread
+
+        The bot and the sweep workers compete for SQLite's write lock, and
+        waiting for it (up to the 5s busy timeout) must not stall the event
+        loop, so writes made from coroutines go through here.
+        """
+        return await asyncio.to_thread(method, *args)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run a block of writes atomically"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def migrate_json(self):
+        """Import the legacy JSON files once, then rename them out of the way"""
+        if os.path.exists(USER_DATA_FILE):
+            data = load_user_data()
+            with self.transaction() as conn:
+                for user_id, addresses in data.items():
+                    for address in addresses:
+                        conn.execute(
+                            'INSERT OR IGNORE INTO user_addresses VALUES (?, ?, ?, ?)',
+                            (user_id, address, normalize_address(address), time.time())
+                        )
+            os.replace(USER_DATA_FILE, f'{USER_DATA_FILE}.migrated')
+            logging.info(f'Migrated addresses of {len(data)} users from {USER_DATA_FILE}')
 
-user_addresses = load_user_data()
+        if VERIFICATION_CODES_FILE.exists():
+            with open(VERIFICATION_CODES_FILE, 'r') as f:
+                codes = json.load(f)
+            with self.transaction() as conn:
+                conn.executemany('INSERT OR IGNORE INTO verification_codes VALUES (?, ?)', codes.items())
+            VERIFICATION_CODES_FILE.replace(VERIFICATION_CODES_FILE.with_name(VERIFICATION_CODES_FILE.name + '.migrated'))
+            logging.info(f'Migrated {len(codes)} verification codes from {VERIFICATION_CODES_FILE}')
+
+    def load_addresses(self) -> Dict[str, List[str]]:
+        """Get every registered address grouped by user, in the order they were added"""
+        data: Dict[str, List[str]] = {}
+        for user_id, address in self.conn.execute(
+                'SELECT user_id, address FROM user_addresses ORDER BY rowid'):
+            data.setdefault(user_id, []).append(address)
+        return data
+
+    def add_address(self, user_id: str, address: str) -> bool:
+        """Register an address, returning False if the user already has it"""
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO user_addresses VALUES (?, ?, ?, ?)',
+            (user_id, address, normalize_address(address), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def remove_address(self, user_id: str, address: str) -> bool:
+        """Unregister an address, returning False if the user didn't have it"""
+        cursor = self.conn.execute(
+            'DELETE FROM user_addresses WHERE user_id = ? AND normalized = ?',
+            (user_id, normalize_address(address))
+        )
+        return cursor.rowcount == 1
+
+    def load_verification_codes(self) -> Dict[str, str]:
+        """Get every user's verification code"""
+        return dict(self.conn.execute('SELECT user_id, code FROM verification_codes'))
+
+    def save_verification_codes(self, codes: Dict[str, str]):
+        """Store a batch of new verification codes in one transaction"""
+        with self.transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO verification_codes VALUES (?, ?)', codes.items())
+
+    def save_holdings(self, user_id: str, holdings: Dict[str, Tuple[int, Optional[str]]], checked_slugs) -> bool:
+        """Replace a user's last-known holdings in the collections that were checked
+
+        Returns:
+            True if the holdings differ from the ones recorded before
+        """
+        now = time.time()
+        checked_slugs = list(checked_slugs)
+        with self.transaction() as conn:
+            previous = {}
+            for slug in checked_slugs:
+                row = conn.execute('SELECT inscriptions_count, inscriptions FROM holdings WHERE user_id = ? AND slug = ?',
+                                   (user_id, slug)).fetchone()
+                if row is not None:
+                    previous[slug] = tuple(row)
+            conn.executemany('DELETE FROM holdings WHERE user_id = ? AND slug = ?',
+                             [(user_id, slug) for slug in checked_slugs])
+            conn.executemany(
+                'INSERT INTO holdings VALUES (?, ?, ?, ?, ?)',
+                [(user_id, slug, count, inscriptions, now) for slug, (count, inscriptions) in holdings.items()]
+            )
+            # Also recorded for collections the user holds nothing in, which have no holdings row
+            conn.executemany('INSERT OR REPLACE INTO holdings_checked VALUES (?, ?, ?)',
+                             [(user_id, slug, now) for slug in checked_slugs])
+        return previous != {slug: tuple(holding) for slug, holding in holdings.items()}
+
+    def load_holdings(self, user_id: str, slugs) -> Tuple[Dict[str, Tuple[int, Optional[str]]], Optional[float]]:
+        """Get a user's last-known holdings in the given collections and when the oldest of them was checked
+
+        The time is None unless every one of the collections has been checked
+        for the user, whether or not they held anything in it.
+        """
+        slugs = list(slugs)
+        holdings = {}
+        checked_at: Dict[str, float] = {}
+        for slug, count, inscriptions, updated_at in self.conn.execute(
+                'SELECT slug, inscriptions_count, inscriptions, updated_at FROM holdings WHERE user_id = ?',
+                (user_id,)):
+            if slug in slugs:
+                holdings[slug] = (count, inscriptions)
+                checked_at[slug] = updated_at  # holdings saved before checks were recorded separately
+        for slug, row_checked_at in self.conn.execute(
+                'SELECT slug, checked_at FROM holdings_checked WHERE user_id = ?', (user_id,)):
+            if slug in slugs:
+                checked_at[slug] = row_checked_at
+        if not slugs or any(slug not in checked_at for slug in slugs):
+            return holdings, None
+        return holdings, min(checked_at[slug] for slug in slugs)
+
+    def load_guild_collections(self) -> Dict[int, Dict[str, str]]:
+        """Get every guild's collection -> role name mapping"""
+        data: Dict[int, Dict[str, str]] = {}
+        for guild_id, slug, role_name in self.conn.execute(
+                'SELECT guild_id, slug, role_name FROM guild_collections'):
+            data.setdefault(guild_id, {})[slug] = role_name
+        return data
+
+    def set_guild_collection(self, guild_id: int, slug: str, role_name: str):
+        self.conn.execute('INSERT OR REPLACE INTO guild_collections VALUES (?, ?, ?)', (guild_id, slug, role_name))
+
+    def remove_guild_collection(self, guild_id: int, slug: str) -> bool:
+        cursor = self.conn.execute('DELETE FROM guild_collections WHERE guild_id = ? AND slug = ?', (guild_id, slug))
+        return cursor.rowcount == 1
+
+    def load_role_rules(self) -> Dict[int, List[Tuple[str, str, int, str]]]:
+        """Get every guild's (role name, slug, min count, comma-joined inscription IDs) rules"""
+        data: Dict[int, List[Tuple[str, str, int, str]]] = {}
+        for guild_id, role_name, slug, min_count, inscription_ids in self.conn.execute(
+                'SELECT guild_id, role_name, slug, min_count, inscription_ids FROM role_rules ORDER BY rowid'):
+            data.setdefault(guild_id, []).append((role_name, slug, min_count, inscription_ids))
+        return data
+
+    def set_role_rule(self, guild_id: int, role_name: str, slug: str, min_count: int, inscription_ids: str):
+        self.conn.execute('INSERT OR REPLACE INTO role_rules VALUES (?, ?, ?, ?, ?)',
+                          (guild_id, role_name, slug, min_count, inscription_ids))
+
+    def remove_role_rule(self, guild_id: int, role_name: str) -> bool:
+        cursor = self.conn.execute('DELETE FROM role_rules WHERE guild_id = ? AND role_name = ?', (guild_id, role_name))
+        return cursor.rowcount == 1
+
+    def load_check_schedule(self) -> Dict[int, Dict[str, Tuple[float, float]]]:
+        """Get every guild's user -> (next check time, interval) schedule"""
+        data: Dict[int, Dict[str, Tuple[float, float]]] = {}
+        for guild_id, user_id, next_check, interval in self.conn.execute(
+                'SELECT guild_id, user_id, next_check, interval FROM check_schedule'):
+            data.setdefault(guild_id, {})[user_id] = (next_check, interval)
+        return data
+
+    def save_check_schedule(self, guild_id: int, entries: Dict[str, Tuple[float, float]]):
+        with self.transaction() as conn:
+            conn.executemany('INSERT OR REPLACE INTO check_schedule VALUES (?, ?, ?, ?)',
+                             [(guild_id, user_id, next_check, interval)
+                              for user_id, (next_check, interval) in entries.items()])
+
+    def remove_check_schedule(self, guild_id: int, user_ids):
+        with self.transaction() as conn:
+            conn.executemany('DELETE FROM check_schedule WHERE guild_id = ? AND user_id = ?',
+                             [(guild_id, user_id) for user_id in user_ids])
+
+    def load_user_addresses(self, user_id: str) -> List[str]:
+        """Get one user's addresses straight from the database"""
+        return [address for (address,) in self.conn.execute(
+            'SELECT address FROM user_addresses WHERE user_id = ? ORDER BY rowid', (user_id,))]
+
+    def enqueue_sweep_jobs(self, batch: str, guild_id: int, jobs: List[Tuple[str, str]]) -> int:
+        """Queue (user_id, payload) jobs, skipping users that already have one pending"""
+        now = time.time()
+        with self.transaction() as conn:
+            cursor = conn.executemany(
+                'INSERT OR IGNORE INTO sweep_jobs (batch, guild_id, user_id, payload, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(batch, guild_id, user_id, payload, now) for user_id, payload in jobs]
+            )
+            return cursor.rowcount
+
+    def claim_sweep_jobs(self, worker: str, limit: int) -> List[dict]:
+        """Lease up to limit queued jobs, including ones whose previous lease ran out"""
+        now = time.time()
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, batch, guild_id, user_id, payload, attempts FROM sweep_jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND claimed_at < ?) ORDER BY id LIMIT ?",
+                (now - SWEEP_JOB_LEASE, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE sweep_jobs SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(worker, now, row[0]) for row in rows]
+            )
+        keys = ('id', 'batch', 'guild_id', 'user_id', 'payload', 'attempts')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def finish_sweep_job(self, job_id: int, status: str, result: dict):
+        """Record a job's outcome: 'done', 'failed', or 'queued' to retry it"""
+        try:
+            self.conn.execute(
+                'UPDATE sweep_jobs SET status = ?, result = ?, claimed_at = NULL WHERE id = ?',
+                (status, json.dumps(result), job_id)
+            )
+        except sqlite3.IntegrityError:
+            # A newer job for the same member is already queued and supersedes this retry
+            self.conn.execute(
+                "UPDATE sweep_jobs SET status = 'done', result = ?, claimed_at = NULL WHERE id = ?",
+                (json.dumps({'superseded': True}), job_id)
+            )
+
+    def take_finished_sweep_jobs(self, limit: int = 1000) -> List[dict]:
+        """Remove and return finished jobs, oldest first"""
+        with self.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, batch, guild_id, user_id, status, result FROM sweep_jobs "
+                "WHERE status IN ('done', 'failed') ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            conn.executemany('DELETE FROM sweep_jobs WHERE id = ?', [(row[0],) for row in rows])
+        keys = ('id', 'batch', 'guild_id', 'user_id', 'status', 'result')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        self.conn.close()
+        self._local.conn = None
+
+store = Store(DB_FILE)
+if not SWEEP_WORKER:
+    store.migrate_json()
+
+class AddressRegistry:
+    """Wallet addresses registered per Discord user, with a reverse address -> users index
+
+    The maps are held in memory for O(1) lookups; every change is written
+    through to the store.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+        self._by_user: Dict[str, List[str]] = store.load_addresses()
+        self._by_address: Dict[str, Set[str]] = {}
+        for user_id, addresses in self._by_user.items():
+            for address in addresses:
+                self._by_address.setdefault(normalize_address(address), set()).add(user_id)
+
+    def get(self, user_id: str) -> List[str]:
+        """Get the addresses registered by a user"""
+        return self._by_user.get(user_id, [])
+
+    def user_ids(self) -> List[str]:
+        """Get every user with at least one registered address"""
+        return [user_id for user_id, addresses in self._by_user.items() if addresses]
+
+    def users_for(self, addresses) -> Set[str]:
+        """Get the users that registered any of the given normalized addresses"""
+        user_ids = set()
+        for address in addresses:
+            user_ids |= self._by_address.get(address, set())
+        return user_ids
+
+    async def add(self, user_id: str, address: str) -> bool:
+        """Register an address for a user, returning False if it was already registered"""
+        if not await self.store.run(self.store.add_address, user_id, address):
+            return False
+        self._by_address.setdefault(normalize_address(address), set()).add(user_id)
+        self._by_user.setdefault(user_id, []).append(address)
+        return True
+
+    async def remove(self, user_id: str, address: str) -> bool:
+        """Unregister an address for a user, returning False if it wasn't registered"""
+        if not await self.store.run(self.store.remove_address, user_id, address):
+            return False
+        key = normalize_address(address)
+        owners = self._by_address.get(key, set())
+        owners.discard(user_id)
+        if not owners:
+            self._by_address.pop(key, None)
+        remaining = [addr for addr in self._by_user.get(user_id, []) if normalize_address(addr) != key]
+        if remaining:
+            self._by_user[user_id] = remaining
+        else:
+            self._by_user.pop(user_id, None)
+        return True
+
+address_registry = AddressRegistry(store)
+
+class GuildCollections:
+    """Collection -> holder role mapping of every guild, written through to the store
+
+    All guilds share one snapshot cache and rate limiter, so upstream traffic
+    depends on the set of distinct collections rather than the number of guilds.
+    """
+
+    def __init__(self, store: Store):
+        self.store = store
+        self._by_guild = store.load_guild_collections()
+
+    def get(self, guild_id: int) -> Dict[str, str]:
+        """Get a guild's collection slugs and their role names"""
+        return self._by_guild.get(guild_id, {})
+
+    def slugs(self) -> Set[str]:
+        """Every collection configured in at least one guild"""
+        return {slug for collections in self._by_guild.values() for slug in collections}
+
+    async def set(self, guild_id: int, slug: str, role_name: str):
+        await self.store.run(self.store.set_guild_collection, guild_id, slug, role_name)
+        self._by_guild.setdefault(guild_id, {})[slug] = role_name
+
+    async def remove(self, guild_id: int, slug: str) -> bool:
+        if not await self.store.run(self.store.remove_guild_collection, guild_id, slug):
+            return False
+        collections = self._by_guild.get(guild_id, {})
+        collections.pop(slug, None)
+        if not collections:
+            self._by_guild.pop(guild_id, None)
+        return True
+
+    def seed(self, guild_id: int, collections: Dict[str, str]):
+        """Give a guild a starting configuration unless it already has one"""
+        if guild_id in self._by_guild:
+            return
+        with self.store.transaction() as conn:
+            conn.executemany('INSERT OR IGNORE INTO guild_collections VALUES (?, ?, ?)',
+                             [(guild_id, slug, role_name) for slug, role_name in collections.items()])
+        self._by_guild[guild_id] = dict(collections)
+        logging.info(f'Configured the default collections for guild {guild_id}')
+
+guild_collections = GuildCollections(store)
+home_guild_id = os.getenv('GUILD_ID', '0')
+if not SWEEP_WORKER and home_guild_id.isdigit() and int(home_guild_id):
+    # Single-server deployments keep working without any configuration
+    guild_collections.seed(int(home_guild_id), COLLECTIONS)
+
+class RoleRule:
+    """A declarative condition on a member's holding in one collection that earns a role
+
+    Without inscription IDs it is a count threshold (e.g. 5+ inscriptions)
+    on the member's holding summed over all of their registered wallets.
+    With IDs it is met by owning at least min_count of them: a single ID for
+    a specific inscription, or the IDs sharing a trait for a trait role.
+    Either way it is answered from the snapshot's indexes, without looking at
+    the member's inscriptions list.
+    """
+
+    def __init__(self, role_name: str, slug: str, min_count: int = 1, inscription_ids=()):
+        self.role_name = role_name
+        self.slug = slug
+        self.min_count = max(1, min_count)
+        self.inscription_ids: Tuple[str, ...] = tuple(normalize_inscription_id(i) for i in inscription_ids)
+
+    def matches(self, snapshot: Optional['CollectionSnapshot'], wallets: Set[str], count: int) -> bool:
+        """Whether a member with these normalized wallets and this combined holding count earns the role"""
+        if not self.inscription_ids:
+            return count >= self.min_count
+        if snapshot is None:
+            return False
+        owned = sum(1 for inscription_id in self.inscription_ids if snapshot.owner_of(inscription_id) in wallets)
+        return owned >= self.min_count
+
+    def describe(self) -> str:
+        if not self.inscription_ids:
+            return f"{self.min_count}+ inscriptions in `{self.slug}` across all registered wallets"
+        if len(self.inscription_ids) == 1:
+            return f"inscription `{self.inscription_ids[0]}` in `{self.slug}`"
+        return f"{self.min_count} of {len(self.inscription_ids)} listed inscriptions in `{self.slug}`"
+
+    def to_dict(self) -> dict:
+        return {'role_name': self.role_name, 'slug': self.slug, 'min_count': self.min_count,
+                'inscription_ids': list(self.inscription_ids)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RoleRule':
+        return cls(data['role_name'], data['slug'], data['min_count'], data['inscription_ids'])
+
+class RoleRules:
+    """Extra role rules of every guild on top of the per-collection holder roles, written through to the store"""
+
+    def __init__(self, store: Store):
+        self.store = store
+        self._by_guild: Dict[int, List[RoleRule]] = {
+            guild_id: [RoleRule(role_name, slug, min_count, [i for i in inscription_ids.split(',') if i])
+                       for role_name, slug, min_count, inscription_ids in rows]
+            for guild_id, rows in store.load_role_rules().items()
+        }
+
+    def get(self, guild_id: int) -> List[RoleRule]:
+        return self._by_guild.get(guild_id, [])
+
+    async def set(self, guild_id: int, rule: RoleRule):
+        """Add a rule, replacing any earlier rule for the same role"""
+        await self.store.run(self.store.set_role_rule, guild_id, rule.role_name, rule.slug, rule.min_count,
+                             ','.join(rule.inscription_ids))
+        rules = [existing for existing in self.get(guild_id) if existing.role_name != rule.role_name]
+        self._by_guild[guild_id] = rules + [rule]
+
+    async def remove(self, guild_id: int, role_name: str) -> bool:
+        if not await self.store.run(self.store.remove_role_rule, guild_id, role_name):
+            return False
+        rules = [rule for rule in self.get(guild_id) if rule.role_name != role_name]
+        if rules:
+            self._by_guild[guild_id] = rules
+        else:
+            self._by_guild.pop(guild_id, None)
+        return True
+
+    def inscription_slugs(self) -> Set[str]:
+        """Collections with a rule on specific inscriptions in any guild"""
+        return {rule.slug for rules in self._by_guild.values() for rule in rules if rule.inscription_ids}
+
+    async def remove_collection(self, guild_id: int, slug: str):
+        """Drop the rules that depend on a collection the guild no longer uses"""
+        for rule in [rule for rule in self.get(guild_id) if rule.slug == slug]:
+            await self.remove(guild_id, rule.role_name)
+
+role_rules = RoleRules(store)
+
+class CheckSchedule:
+    """When each registered member of each guild is next re-verified
+
+    Every member carries their own next check time and interval, so checks
+    are spread over time instead of arriving as one burst per interval. A
+    member whose holdings just changed is checked again after
+    CHECK_INTERVAL_MIN; every unchanged check doubles the interval up to
+    CHECK_INTERVAL_MAX, or up to WALLET_CHECK_INTERVAL while they hold a
+    collection that is trading actively. Held in memory and written through
+    to the store so the spread survives restarts.
+
+    The clock and random source can be swapped out, e.g. for tests.
+    """
+
+    def __init__(self, store: Store, clock=time.time, rng: Optional[random.Random] = None):
+        self.store = store
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._by_guild = store.load_check_schedule()
+        self._activity: Dict[str, float] = {}  # slug -> smoothed share of holders changing per refresh
+
+    def _jittered(self, interval: float) -> float:
+        return interval * self._rng.uniform(1 - CHECK_JITTER, 1 + CHECK_JITTER)
+
+    async def ensure(self, guild_id: int, user_ids):
+        """Schedule members seen for the first time at random points of the next interval"""
+        entries = self._by_guild.setdefault(guild_id, {})
+        now = self._clock()
+        interval = WALLET_CHECK_INTERVAL * 60
+        new = {user_id: (now + self._rng.uniform(0, interval), interval)
+               for user_id in user_ids if user_id not in entries}
+        if new:
+            entries.update(new)
+            await self.store.run(self.store.save_check_schedule, guild_id, new)
+
+    async def forget(self, guild_id: int, user_ids):
+        entries = self._by_guild.get(guild_id, {})
+        user_ids = [user_id for user_id in user_ids if entries.pop(user_id, None) is not None]
+        if user_ids:
+            await self.store.run(self.store.remove_check_schedule, guild_id, user_ids)
+
+    async def expedite(self, guild_id: int, user_ids, within: float = 0):
+        """Make members due within the given number of seconds and shorten their interval"""
+        entries = self._by_guild.setdefault(guild_id, {})
+        now = self._clock()
+        updated = {}
+        for user_id in user_ids:
+            next_check, _ = entries.get(user_id, (now, 0))
+            updated[user_id] = (min(next_check, now + self._rng.uniform(0, within)), CHECK_INTERVAL_MIN * 60)
+        if updated:
+            entries.update(updated)
+            await self.store.run(self.store.save_check_schedule, guild_id, updated)
+
+    def due(self, guild_id: int, limit: int) -> List[str]:
+        """The members whose check is due, most overdue first"""
+        now = self._clock()
+        entries = self._by_guild.get(guild_id, {})
+        overdue = [(next_check, user_id) for user_id, (next_check, _) in entries.items() if next_check <= now]
+        CHECKS_DUE.set(len(overdue), guild=str(guild_id))
+        return [user_id for _, user_id in heapq.nsmallest(limit, overdue)]
+
+    async def dispatched(self, guild_id: int, user_ids):
+        """Push members being checked one interval out, in case their result never arrives"""
+        entries = self._by_guild.get(guild_id, {})
+        now = self._clock()
+        updated = {user_id: (now + self._jittered(entries[user_id][1]), entries[user_id][1])
+                   for user_id in user_ids if user_id in entries}
+        if updated:
+            entries.update(updated)
+            await self.store.run(self.store.save_check_schedule, guild_id, updated)
+
+    async def record(self, guild_id: int, user_id: str, changed: bool, held_slugs=()):
+        """Schedule a member's next check from the outcome of the one just made"""
+        entries = self._by_guild.setdefault(guild_id, {})
+        _, interval = entries.get(user_id, (0, WALLET_CHECK_INTERVAL * 60))
+        if changed:
+            interval = CHECK_INTERVAL_MIN * 60
+        else:
+            interval = min(interval * 2, CHECK_INTERVAL_MAX * 60)
+            if any(self._activity.get(slug, 0) >= ACTIVE_COLLECTION_CHURN for slug in held_slugs):
+                interval = min(interval, WALLET_CHECK_INTERVAL * 60)
+        entry = (self._clock() + self._jittered(interval), interval)
+        entries[user_id] = entry
+        await self.store.run(self.store.save_check_schedule, guild_id, {user_id: entry})
+
+    def note_refresh(self, slug: str, changed_wallets: int, holders: int):
+        """Track how actively a collection trades from the churn seen at each refresh"""
+        churn = changed_wallets / holders if holders else 0
+        self._activity[slug] = 0.5 * self._activity.get(slug, churn) + 0.5 * churn
+
+    def active_collections(self) -> Set[str]:
+        return {slug for slug, churn in self._activity.items() if churn >= ACTIVE_COLLECTION_CHURN}
+
+    def stats(self, guild_id: int) -> Tuple[int, int, float]:
+        """(members scheduled, members due, median interval in seconds) of a guild"""
+        entries = self._by_guild.get(guild_id, {})
+        if not entries:
+            return 0, 0, 0.0
+        now = self._clock()
+        intervals = sorted(interval for _, interval in entries.values())
+        return len(entries), sum(1 for next_check, _ in entries.values() if next_check <= now), intervals[len(intervals) // 2]
+
+check_schedule = CheckSchedule(store)
 
 def has_collection_permission():
     async def predicate(ctx):
@@ -612,94 +2508,666 @@ def has_collection_permission():
                 ctx.author.guild_permissions.manage_roles)
     return commands.check(predicate)
 
-async def check_rate_limit():
-    """Implement rate limiting for API calls"""
-    now = datetime.now()
-    while request_times and (now - request_times[0]).seconds >= RATE_LIMIT_WINDOW:
-        request_times.popleft()
-    if len(request_times) >= RATE_LIMIT_QPM:
-        sleep_time = RATE_LIMIT_WINDOW - (now - request_times[0]).seconds
-        await asyncio.sleep(sleep_time)
-    request_times.append(now)
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(tz=timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+@contextlib.asynccontextmanager
+async def upstream_request(limiter: TokenBucket, url: str, **kwargs):
+    """GET an upstream URL under its rate limiter, retrying 429 and 5xx responses
+
+    429s honor Retry-After (or back off exponentially) and block the whole
+    limiter, so other callers don't hit the same wall. Yields the final
+    response, whatever its status.
+    """
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        waited = await limiter.acquire()
+        RATE_LIMIT_WAIT_SECONDS.observe(waited, upstream=limiter.name)
+        if waited >= 1:
+            logging.info(f"Waited {waited:.1f}s for the {limiter.name} rate limit")
+
+        started = time.perf_counter()
+        response = await get_http_session().get(url, **kwargs)
+        UPSTREAM_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, upstream=limiter.name, status=response.status)
+        if response.status == 429:
+            UPSTREAM_THROTTLED.inc(upstream=limiter.name)
+        retryable = response.status == 429 or response.status >= 500
+        if retryable and attempt < UPSTREAM_MAX_RETRIES:
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            if delay is None:
+                delay = UPSTREAM_BACKOFF_BASE * 2 ** attempt
+            response.release()
+            logging.warning(f"{limiter.name} returned {response.status}, retrying in {delay:.1f}s")
+            if response.status == 429:
+                limiter.penalize(delay)
+            else:
+                await asyncio.sleep(delay)
+            continue
+
+        try:
+            yield response
+        finally:
+            response.release()
+        return
 
 from typing import Tuple
 
-async def verify_ownership(address: str, collection_slug: str) -> Tuple[bool, Optional[int], Optional[str]]:
-    """Verify if an address owns any inscriptions in a collection using BestInSlot API
-    
-    Returns:
-        Tuple containing:
-        - bool: Whether the address owns any inscriptions
-        - Optional[int]: Number of inscriptions owned (None if address not found)
-        - Optional[str]: List of owned inscriptions (None if address not found)
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight call
+
+    The call runs as its own task, so a caller that gives up (e.g. an
+    interaction timing out) doesn't cancel it for everyone else.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0  # calls that joined an existing flight
+
+    async def run(self, key: str, func, *args):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc(kind=self.name)
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+class CollectionSnapshot:
+    """Holder index built from one BestInSlot collection snapshot"""
+
+    def __init__(self, slug: str, holders: Dict[str, Tuple[int, str]], fetched_at: float,
+                 content_hash: Optional[str] = None, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None, owners: Optional[Dict[str, str]] = None,
+                 count_buckets: Optional[Dict[int, int]] = None):
+        self.slug = slug
+        self.holders = holders  # normalized wallet -> (inscriptions_count, inscriptions)
+        self.fetched_at = fetched_at
+        self.content_hash = content_hash
+        # HTTP validators for conditional refreshes
+        self.etag = etag
+        self.last_modified = last_modified
+        # Built by the parser where possible, otherwise on first use
+        self._owners = owners  # inscription ID -> wallet
+        self._count_buckets = count_buckets  # inscriptions_count -> number of wallets
+
+    def revalidated(self, etag: Optional[str], last_modified: Optional[str]) -> 'CollectionSnapshot':
+        """Copy of this snapshot marked fresh, sharing the already parsed index"""
+        return CollectionSnapshot(
+            self.slug, self.holders, time.time(), self.content_hash,
+            etag or self.etag, last_modified or self.last_modified,
+            self._owners, self._count_buckets
+        )
+
+    def owner_of(self, inscription_id: str) -> Optional[str]:
+        """Get the normalized wallet holding an inscription, or None"""
+        if self._owners is None:
+            owners: Dict[str, str] = {}
+            for wallet, (_, inscriptions) in self.holders.items():
+                index_inscriptions(owners, wallet, inscriptions)
+            self._owners = owners
+        return self._owners.get(normalize_inscription_id(inscription_id))
+
+    def holders_with_at_least(self, count: int) -> int:
+        """Number of wallets holding at least count inscriptions"""
+        if self._count_buckets is None:
+            count_buckets: Dict[int, int] = {}
+            for holding_count, _ in self.holders.values():
+                count_buckets[holding_count] = count_buckets.get(holding_count, 0) + 1
+            self._count_buckets = count_buckets
+        return sum(wallets for bucket, wallets in self._count_buckets.items() if bucket >= count)
+
+    @property
+    def age(self) -> float:
+        """Seconds since this snapshot was fetched"""
+        return time.time() - self.fetched_at
+
+    def lookup(self, address: str) -> Optional[Tuple[int, str]]:
+        """Get (inscriptions_count, inscriptions) for an address, or None if it holds nothing"""
+        return self.holders.get(normalize_address(address))
+
+def normalize_inscription_id(inscription_id: str) -> str:
+    """Normalize an inscription ID (hex txid + 'i' + index) for index lookups"""
+    return inscription_id.strip().lower()
+
+def index_inscriptions(owners: Dict[str, str], wallet: str, inscriptions: str):
+    """Add a holder's comma-joined inscriptions to an inscription ID -> wallet index"""
+    for inscription_id in inscriptions.split(','):
+        inscription_id = normalize_inscription_id(inscription_id)
+        if inscription_id:
+            owners[inscription_id] = wallet
+
+class SnapshotDelta:
+    """Holder changes in one collection between two consecutive snapshots"""
+
+    def __init__(self, slug: str, added: Set[str], removed: Set[str], changed: Dict[str, Tuple[int, int]]):
+        self.slug = slug
+        self.added = added  # wallets that started holding
+        self.removed = removed  # wallets that stopped holding
+        self.changed = changed  # wallet -> (old count, new count) for holders whose inscriptions changed
+
+    @property
+    def wallets(self) -> Set[str]:
+        """Every wallet affected by this delta"""
+        return self.added | self.removed | self.changed.keys()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return (f"<SnapshotDelta {self.slug}: +{len(self.added)} -{len(self.removed)} "
+                f"~{len(self.changed)}>")
+
+def compute_snapshot_delta(old: CollectionSnapshot, new: CollectionSnapshot) -> SnapshotDelta:
+    """Diff the holder indexes of two snapshots of the same collection"""
+    old_holders, new_holders = old.holders, new.holders
+    if isinstance(old_holders, MappedHolders):
+        # One sequential pass beats a binary search per wallet
+        old_holders = dict(old_holders.items())
+    added = new_holders.keys() - old_holders.keys()
+    removed = old_holders.keys() - new_holders.keys()
+    changed = {}
+    for wallet, holding in new_holders.items():
+        previous = old_holders.get(wallet)
+        if previous is not None and previous != holding:
+            changed[wallet] = (previous[0], holding[0])
+    return SnapshotDelta(new.slug, added, removed, changed)
+
+# On-disk snapshot format, little endian:
+#   header | metadata JSON | entry table | wallet blob | inscriptions blob
+# Entries are sorted by wallet and point into the two blobs, so a lookup is a
+# binary search over fixed-size records straight out of the mapped file.
+SNAPSHOT_FILE_MAGIC = b'VSNP'
+SNAPSHOT_FILE_VERSION = 1
+# magic, version, fetched_at, holder count, content hash, metadata length, wallet blob offset, inscriptions blob offset
+SNAPSHOT_HEADER = struct.Struct('<4sHdI16sIQQ')
+SNAPSHOT_FETCHED_AT = struct.Struct('<d')
+SNAPSHOT_FETCHED_AT_OFFSET = 6  # right after magic and version
+# wallet offset, wallet length, inscriptions_count, inscriptions offset, inscriptions length
+SNAPSHOT_ENTRY = struct.Struct('<QHIQI')
+
+class MappedItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+class MappedHolders(Mapping):
+    """Read-only holder index served from a memory-mapped snapshot file
+
+    Only the pages a lookup touches are read in, so a restored snapshot costs
+    next to no resident memory until it is used.
+    """
+
+    def __init__(self, buffer: mmap.mmap, count: int, entries_offset: int, wallets_offset: int, blob_offset: int):
+        self._buffer = buffer
+        self._count = count
+        self._entries_offset = entries_offset
+        self._wallets_offset = wallets_offset
+        self._blob_offset = blob_offset
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int]:
+        return SNAPSHOT_ENTRY.unpack_from(self._buffer, self._entries_offset + index * SNAPSHOT_ENTRY.size)
+
+    def _wallet(self, entry) -> bytes:
+        start = self._wallets_offset + entry[0]
+        return self._buffer[start:start + entry[1]]
+
+    def _holding(self, entry) -> Tuple[int, str]:
+        start = self._blob_offset + entry[3]
+        return entry[2], self._buffer[start:start + entry[4]].decode()
+
+    def __getitem__(self, wallet: str) -> Tuple[int, str]:
+        key = wallet.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            current = self._wallet(entry)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self._holding(entry)
+        raise KeyError(wallet)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self._wallet(self._entry(index)).decode()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> MappedItems:
+        return MappedItems(self)
+
+    def iter_items(self):
+        """(wallet, holding) pairs in one sequential pass over the file"""
+        for index in range(self._count):
+            entry = self._entry(index)
+            yield self._wallet(entry).decode(), self._holding(entry)
+
+def write_snapshot_file(path: Path, snapshot: CollectionSnapshot):
+    """Persist a snapshot in the mappable format, replacing any previous file atomically"""
+    wallets = sorted(snapshot.holders)  # UTF-8 byte order matches str order
+    metadata = json.dumps({
+        'slug': snapshot.slug,
+        'etag': snapshot.etag,
+        'last_modified': snapshot.last_modified,
+    }).encode()
+    content_hash = bytes.fromhex(snapshot.content_hash) if snapshot.content_hash else bytes(16)
+    entries_offset = SNAPSHOT_HEADER.size + len(metadata)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(f'.{os.getpid()}.tmp')  # bot and workers may write concurrently
+    with open(temp_path, 'wb') as f:
+        f.write(bytes(entries_offset))  # header is filled in once the blob sizes are known
+        f.seek(SNAPSHOT_HEADER.size)
+        f.write(metadata)
+
+        wallet_offset = blob_size = 0
+        for wallet in wallets:
+            count, inscriptions = snapshot.holders[wallet]
+            wallet_length = len(wallet.encode())
+            inscriptions_length = len(inscriptions.encode())
+            f.write(SNAPSHOT_ENTRY.pack(wallet_offset, wallet_length, count, blob_size, inscriptions_length))
+            wallet_offset += wallet_length
+            blob_size += inscriptions_length
+        wallets_offset = entries_offset + len(wallets) * SNAPSHOT_ENTRY.size
+        for wallet in wallets:
+            f.write(wallet.encode())
+        for wallet in wallets:
+            f.write(snapshot.holders[wallet][1].encode())
+
+        f.seek(0)
+        f.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_FILE_MAGIC, SNAPSHOT_FILE_VERSION, snapshot.fetched_at, len(wallets),
+            content_hash, len(metadata), wallets_offset, wallets_offset + wallet_offset
+        ))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def touch_snapshot_file(path: Path, fetched_at: float):
+    """Record a successful revalidation without rewriting the file"""
+    with open(path, 'r+b') as f:
+        f.seek(SNAPSHOT_FETCHED_AT_OFFSET)
+        f.write(SNAPSHOT_FETCHED_AT.pack(fetched_at))
+
+def open_snapshot_file(path: Path, slug: str) -> Optional[CollectionSnapshot]:
+    """Map a persisted snapshot back in; None if it is missing, for another collection or corrupt"""
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not map snapshot file {path}: {e}")
+        return None
+
+    try:
+        (magic, version, fetched_at, count, content_hash, metadata_length,
+         wallets_offset, blob_offset) = SNAPSHOT_HEADER.unpack_from(buffer)
+        if magic != SNAPSHOT_FILE_MAGIC or version != SNAPSHOT_FILE_VERSION:
+            raise ValueError("unknown format")
+        entries_offset = SNAPSHOT_HEADER.size + metadata_length
+        metadata = json.loads(buffer[SNAPSHOT_HEADER.size:entries_offset])
+        if metadata.get('slug') != slug:
+            raise ValueError(f"holds {metadata.get('slug')!r}")
+        if entries_offset + count * SNAPSHOT_ENTRY.size != wallets_offset or not wallets_offset <= blob_offset <= len(buffer):
+            raise ValueError("inconsistent layout")
+        # Blobs are written in entry order, so the last entry must end exactly where each blob does
+        wallets_end, blob_end = 0, 0
+        if count:
+            last = SNAPSHOT_ENTRY.unpack_from(buffer, wallets_offset - SNAPSHOT_ENTRY.size)
+            wallets_end, blob_end = last[0] + last[1], last[3] + last[4]
+        if wallets_offset + wallets_end != blob_offset or blob_offset + blob_end != len(buffer):
+            raise ValueError("truncated")
+    except (struct.error, ValueError) as e:
+        buffer.close()
+        logging.warning(f"Ignoring snapshot file {path}: {e}")
+        return None
+
+    holders = MappedHolders(buffer, count, entries_offset, wallets_offset, blob_offset)
+    return CollectionSnapshot(
+        slug, holders, fetched_at, content_hash.hex() if any(content_hash) else None,
+        metadata.get('etag'), metadata.get('last_modified')
+    )
+
+class SnapshotCache:
+    """Fetches each collection snapshot at most once per TTL window and shares it between all checks
+
+    Refreshes are conditional: unchanged payloads keep the existing index, and
+    changed ones queue a SnapshotDelta for the periodic sweep to consume. With
+    a directory, every snapshot is also persisted there and restore() maps
+    them back in after a restart, so nothing is refetched before its TTL.
+
+    A follower (a sweep worker) never fetches upstream: it serves the newest
+    file written by the bot, however old, since every worker fetching on its
+    own would multiply the BestInSlot request budget the rate limiter caps.
+    """
+
+    def __init__(self, ttl: int, directory: Optional[Path] = None, follower: bool = False):
+        self.ttl = ttl
+        self.directory = directory
+        self.follower = follower
+        self._snapshots: Dict[str, CollectionSnapshot] = {}
+        self._persisting: Dict[str, asyncio.Task] = {}
+        self._deltas: Dict[str, List[SnapshotDelta]] = {}
+        self._flights = SingleFlight('snapshot')
+        # Set when deltas were dropped, so consumers know to recheck everyone
+        self.deltas_overflowed = False
+
+    def peek(self, slug: str) -> Optional[CollectionSnapshot]:
+        """Get the cached snapshot for a collection without refreshing it"""
+        return self._snapshots.get(slug)
+
+    def _path(self, slug: str) -> Path:
+        if not is_collection_slug(slug):
+            raise ValueError(f"Invalid collection slug {slug!r}")
+        return self.directory / f'{slug}.snapshot'
+
+    def restore(self, slugs):
+        """Map persisted snapshots back in, keeping their original fetch time"""
+        if self.directory is None:
+            return
+        for slug in slugs:
+            if not is_collection_slug(slug):
+                logging.warning(f"Not restoring a snapshot for invalid collection slug {slug!r}")
+                continue
+            snapshot = open_snapshot_file(self._path(slug), slug)
+            if snapshot is not None:
+                self._snapshots[slug] = snapshot
+                logging.info(f"Restored snapshot for {slug}: {len(snapshot.holders)} holders, {snapshot.age:.0f}s old")
+
+    def _persist(self, previous: Optional[CollectionSnapshot], fresh: CollectionSnapshot):
+        """Write a refreshed snapshot to disk in the background"""
+        if self.directory is None:
+            return
+        earlier = self._persisting.get(fresh.slug)
+
+        async def persist():
+            if earlier is not None:
+                await asyncio.gather(earlier, return_exceptions=True)
+            path = self._path(fresh.slug)
+            try:
+                if (previous is not None and fresh.holders is previous.holders and path.exists()
+                        and (fresh.etag, fresh.last_modified) == (previous.etag, previous.last_modified)):
+                    await asyncio.to_thread(touch_snapshot_file, path, fresh.fetched_at)
+                else:
+                    await asyncio.to_thread(write_snapshot_file, path, fresh)
+            except Exception as e:
+                logging.warning(f"Could not persist snapshot for {fresh.slug}: {e}")
+
+        self._persisting[fresh.slug] = asyncio.create_task(persist())
+
+    async def get(self, slug: str) -> Optional[CollectionSnapshot]:
+        """Get a snapshot for a collection, refreshing it if the TTL has expired
+
+        Falls back to the stale snapshot if the refresh fails, so a BestInSlot
+        outage doesn't strip everyone's roles.
+        """
+        snapshot = self._snapshots.get(slug)
+        if self.follower:
+            return self._follow(slug, snapshot)
+        if snapshot and snapshot.age < self.ttl:
+            CACHE_REQUESTS.inc(cache='snapshot', result='hit')
+            return snapshot
+
+        CACHE_REQUESTS.inc(cache='snapshot', result='miss')
+        # Concurrent callers share one refresh instead of each downloading the snapshot
+        return await self._flights.run(slug, self._refresh, slug)
+
+    def _follow(self, slug: str, snapshot: Optional[CollectionSnapshot]) -> CollectionSnapshot:
+        """Serve the bot's newest persisted snapshot, raising if it hasn't written one yet"""
+        if self.directory is not None and (snapshot is None or snapshot.age >= self.ttl):
+            persisted = open_snapshot_file(self._path(slug), slug)
+            if persisted is not None and (snapshot is None or persisted.fetched_at > snapshot.fetched_at):
+                self._snapshots[slug] = snapshot = persisted
+        if snapshot is None:
+            # Failing the job retries it later instead of treating everyone as a non-holder
+            raise RuntimeError(f"No snapshot for {slug} persisted by the bot yet")
+        CACHE_REQUESTS.inc(cache='snapshot', result='hit' if snapshot.age < self.ttl else 'stale')
+        return snapshot
+
+    async def _refresh(self, slug: str) -> Optional[CollectionSnapshot]:
+        snapshot = self._snapshots.get(slug)
+        started = time.perf_counter()
+        fresh = await fetch_collection_snapshot(slug, snapshot)
+        SNAPSHOT_FETCH_SECONDS.observe(
+            time.perf_counter() - started, collection=slug, outcome='error' if fresh is None else 'ok')
+        if fresh is None:
+            if snapshot:
+                logging.warning(f"Using stale snapshot for {slug} ({snapshot.age:.0f}s old)")
+            return snapshot
+
+        self._snapshots[slug] = fresh
+        self._persist(snapshot, fresh)
+        if snapshot is None:
+            logging.info(f"Cached snapshot for {slug}: {len(fresh.holders)} holders")
+        elif fresh.holders is snapshot.holders:
+            logging.debug(f"Snapshot for {slug} unchanged")
+        else:
+            delta = compute_snapshot_delta(snapshot, fresh)
+            if delta:
+                logging.info(f"Snapshot for {slug} changed: {delta!r}")
+                self._queue_delta(delta)
+        return fresh
+
+    def _queue_delta(self, delta: SnapshotDelta):
+        pending = self._deltas.setdefault(delta.slug, [])
+        if len(pending) >= SNAPSHOT_MAX_PENDING_DELTAS:
+            pending.clear()
+            self.deltas_overflowed = True
+            logging.warning(f"Too many unconsumed deltas for {delta.slug}, dropping them")
+        pending.append(delta)
+
+    def drain_deltas(self) -> List[SnapshotDelta]:
+        """Take all queued deltas, oldest first"""
+        deltas = [delta for pending in self._deltas.values() for delta in pending]
+        self._deltas.clear()
+        return deltas
+
+snapshot_cache = SnapshotCache(SNAPSHOT_TTL, SNAPSHOT_DIR)
+snapshot_cache.restore(guild_collections.slugs())
+
+@metrics.collector
+def collect_snapshot_metrics():
+    for slug in guild_collections.slugs():
+        snapshot = snapshot_cache.peek(slug)
+        if snapshot is not None:
+            SNAPSHOT_HOLDERS.set(len(snapshot.holders), collection=slug)
+            SNAPSHOT_AGE.set(snapshot.age, collection=slug)
+
+class SnapshotParser:
+    """Streaming parser for BestInSlot CSV snapshots
+
+    Bytes are fed in as they arrive and only the wallet, inscriptions_count and
+    inscriptions columns are kept, so peak memory stays close to the size of
+    the resulting holder index. The count buckets used by role rules are
+    filled in the same pass, and so is the inscription owner index when a
+    rule needs it.
+    """
+
+    def __init__(self, index_inscriptions: bool = False):
+        self.holders: Dict[str, Tuple[int, str]] = {}
+        self.owners: Optional[Dict[str, str]] = {} if index_inscriptions else None
+        self.count_buckets: Dict[int, int] = {}
+        self.skipped = 0
+        self.bytes_read = 0
+        self.parse_seconds = 0.0
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._columns: Optional[Tuple[int, int, int]] = None
+        self._tail = b''  # incomplete last line of the previous chunk
+        self._open_record: List[bytes] = []  # lines of a record with a quoted newline
+
+    def feed(self, chunk: bytes):
+        """Parse every complete record in a chunk of the response body"""
+        started = time.perf_counter()
+        self.bytes_read += len(chunk)
+        self._hash.update(chunk)
+        lines = (self._tail + chunk).split(b'\n')
+        self._tail = lines.pop()
+        self._parse_lines(lines)
+        self.parse_seconds += time.perf_counter() - started
+
+    def close(self) -> Dict[str, Tuple[int, str]]:
+        """Flush the last record and return the wallet index"""
+        if self._tail:
+            self._parse_lines([self._tail])
+            self._tail = b''
+        if self._open_record:
+            self.skipped += 1
+            self._open_record = []
+        if self._columns is None:
+            raise ValueError("Snapshot CSV has no header row")
+        return self.holders
+
+    @property
+    def content_hash(self) -> str:
+        """Digest of every byte fed so far"""
+        return self._hash.hexdigest()
+
+    def _parse_lines(self, lines: List[bytes]):
+        records = []
+        for line in lines:
+            # A record continues onto the next line while it has an unclosed quote
+            if self._open_record:
+                self._open_record.append(line)
+                if sum(part.count(b'"') for part in self._open_record) % 2:
+                    continue
+                line = b'\n'.join(self._open_record)
+                self._open_record = []
+            elif line.count(b'"') % 2:
+                self._open_record = [line]
+                continue
+            records.append(line.decode('utf-8', 'replace'))
+
+        for row in csv.reader(records):
+            if not row:
+                continue
+            if self._columns is None:
+                self._read_header(row)
+                continue
+            self._add_row(row)
+
+    def _read_header(self, row: List[str]):
+        columns = [column.lstrip('\ufeff').strip() for column in row]
+        if 'wallet' not in columns:
+            raise ValueError("'wallet' column not found in CSV data")
+        self._columns = (
+            columns.index('wallet'),
+            columns.index('inscriptions_count'),
+            columns.index('inscriptions')
+        )
+
+    def _add_row(self, row: List[str]):
+        wallet_col, count_col, inscriptions_col = self._columns
+        try:
+            wallet = normalize_address(row[wallet_col])
+            count = int(float(row[count_col]))
+            inscriptions = row[inscriptions_col].strip()
+        except (IndexError, ValueError):
+            self.skipped += 1
+            return
+        if wallet:
+            self.holders[wallet] = (count, inscriptions)
+            self.count_buckets[count] = self.count_buckets.get(count, 0) + 1
+            if self.owners is not None:
+                index_inscriptions(self.owners, wallet, inscriptions)
+
+async def fetch_collection_snapshot(collection_slug: str,
+                                    previous: Optional[CollectionSnapshot] = None) -> Optional[CollectionSnapshot]:
+    """Download a collection snapshot from BestInSlot and index it by wallet
+
+    If ``previous`` is given, the request is made conditional on its validators
+    and an unchanged payload returns a copy of it that shares its index.
     """
-    await check_rate_limit()
     try:
-        logging.info(f"\nChecking BestInSlot inscriptions for address: {address}")
-        logging.info(f"Collection slug: {collection_slug}")
-        
         params = {
             'slug': collection_slug,
             'type': 'csv'
         }
-        url = f"{BESTINSLOT_API}?" + "&".join(f"{k}={v}" for k, v in params.items())
-        logging.info(f"Making request to: {url}")
-        
-        response = requests.get(BESTINSLOT_API, params=params)
-        logging.info(f"Response status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            logging.info("Successfully received CSV data")
-            # Read CSV and clean up column names by stripping whitespace
-            df = pd.read_csv(StringIO(response.text))
-            df.columns = df.columns.str.strip()
-            logging.info(f"CSV columns after cleaning: {df.columns.tolist()}")
-            
-            # Clean up wallet addresses
-            df['wallet'] = df['wallet'].str.strip().str.lower()
-            
-            # Debug: Show first few rows
-            logging.info(f"First few rows after cleaning:\n{df.head()}")
-            
-            if 'wallet' not in df.columns:
-                logging.error("'wallet' column not found in CSV data")
-                return False, None, None
-            
-            # Check if the address exists in the snapshot
-            clean_address = address.strip().lower()
-            logging.info(f"Looking for cleaned address: {clean_address}")
-            
-            wallet_data = df[df['wallet'] == clean_address]
-            if wallet_data.empty:
-                logging.info(f"Address {clean_address} not found in collection snapshot - not a holder")
-                logging.info(f"Available wallets: {df['wallet'].head().tolist()}")
-                return False, None, None
-                
-            inscriptions_count = int(wallet_data['inscriptions_count'].iloc[0])
-            inscriptions = wallet_data['inscriptions'].iloc[0]
-            logging.info(f"Found {inscriptions_count} inscriptions for wallet {clean_address}")
-            logging.info(f"Inscriptions: {inscriptions}")
-            
-            # TODO: Future role enhancements
-            # 1. Multiple inscription holders (inscriptions_count > 1)
-            # Example:
-            # if inscriptions_count > 1:
-            #     await ctx.author.add_roles(multiple_holder_role)
-            
-            # 2. Specific inscription holders
-            # Example:
-            # special_inscription = "123abc"
-            # if special_inscription in inscriptions.split(','):
-            #     await ctx.author.add_roles(special_inscription_role)
-            
-            return True, inscriptions_count, inscriptions
-        else:
-            logging.error(f"Error response from BestInSlot API: {response.text}")
-            return False, None, None
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers['If-None-Match'] = previous.etag
+            if previous.last_modified:
+                headers['If-Modified-Since'] = previous.last_modified
+        logging.info(f"Fetching BestInSlot snapshot for {collection_slug}")
+
+        async with upstream_request(bestinslot_limiter, BESTINSLOT_API, params=params, headers=headers) as response:
+            logging.debug(f"Response status code: {response.status}")
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+            if response.status == 304 and previous is not None:
+                return previous.revalidated(etag, last_modified)
+
+            if response.status != 200:
+                logging.error(f"Error response from BestInSlot API: {await response.text()}")
+                return None
+
+            # Parse the body as it arrives instead of buffering the whole CSV
+            parser = SnapshotParser(index_inscriptions=collection_slug in role_rules.inscription_slugs())
+            async for chunk in response.content.iter_chunked(SNAPSHOT_CHUNK_SIZE):
+                parser.feed(chunk)
+            holders = parser.close()
+
+        SNAPSHOT_BYTES.inc(parser.bytes_read, collection=collection_slug)
+        SNAPSHOT_PARSE_SECONDS.observe(parser.parse_seconds, collection=collection_slug)
+        if parser.skipped:
+            logging.warning(f"Skipped {parser.skipped} malformed rows in {collection_slug} snapshot")
+        if previous is not None and parser.content_hash == previous.content_hash:
+            # Same bytes as last time: keep the existing index so nothing downstream is redone
+            return previous.revalidated(etag, last_modified)
+        return CollectionSnapshot(collection_slug, holders, time.time(), parser.content_hash, etag, last_modified,
+                                  parser.owners, parser.count_buckets)
     except Exception as e:
-        logging.error(f"Error verifying ownership: {e}", exc_info=True)
+        logging.error(f"Error fetching snapshot for {collection_slug}: {e}", exc_info=True)
+        return None
+
+async def verify_ownership(address: str, collection_slug: str) -> Tuple[bool, Optional[int], Optional[str]]:
+    """Verify if an address owns any inscriptions in a collection using BestInSlot API
+
+    Returns:
+        Tuple containing:
+        - bool: Whether the address owns any inscriptions
+        - Optional[int]: Number of inscriptions owned (None if address not found)
+        - Optional[str]: Comma-joined owned inscriptions (None if address not found)
+
+    Tiered and specific-inscription roles don't parse this string; RoleRule
+    answers them from the snapshot's owner index and count buckets.
+    """
+    snapshot = await snapshot_cache.get(collection_slug)
+    if snapshot is None:
+        return False, None, None
+
+    holding = snapshot.lookup(address)
+    if holding is None:
+        logging.debug(f"Address {address} not found in {collection_slug} snapshot - not a holder")
         return False, None, None
 
+    inscriptions_count, inscriptions = holding
+    logging.debug(f"Found {inscriptions_count} inscriptions for wallet {address} in {collection_slug}")
+
+    return True, inscriptions_count, inscriptions
+
 def generate_verification_code(length=8):
     """Generate a random verification code"""
     # Use a mix of uppercase letters and numbers for better readability
@@ -708,79 +3176,276 @@ def generate_verification_code(length=8):
     chars = chars.replace('O', '').replace('0', '').replace('I', '').replace('1', '')
     return ''.join(random.choice(chars) for _ in range(length))
 
-async def get_user_verification_code(user_id: str) -> str:
-    """Get or create a verification code for a user"""
-    # Create data directory if it doesn't exist
-    DATA_DIR.mkdir(exist_ok=True)
-    
-    # Load existing codes
-    codes = {}
-    if VERIFICATION_CODES_FILE.exists():
+class VerificationCodeRegistry:
+    """Verification codes held in memory with write-behind persistence
+
+    Codes are loaded once into a user -> code map plus a set of codes in use,
+    so lookups and uniqueness checks are O(1). New codes are queued and
+    written to the store in one transaction shortly afterwards.
+    """
+
+    def __init__(self, store: Store, flush_delay: float):
+        self.store = store
+        self.flush_delay = flush_delay
+        self._codes = store.load_verification_codes()
+        self._in_use = set(self._codes.values())
+        self._pending: Dict[str, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get(self, user_id: str) -> str:
+        """Get or create a user's code"""
+        code = self._codes.get(user_id)
+        if code is None:
+            code = generate_verification_code()
+            while code in self._in_use:
+                code = generate_verification_code()
+            self._codes[user_id] = code
+            self._in_use.add(code)
+            self._pending[user_id] = code
+            self._schedule_flush()
+        return code
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
         try:
-            with open(VERIFICATION_CODES_FILE, 'r') as f:
-                codes = json.load(f)
-        except Exception as e:
-            logging.error(f"Error loading verification codes: {e}")
-    
-    # Get or create code for this user
-    if user_id not in codes:
-        # Generate a unique code
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        except RuntimeError:
+            # No event loop (e.g. called from a script), write straight away
+            self.flush()
+
+    async def _flush_later(self):
+        """Write queued codes after a short delay, until none are left
+
+        Codes queued while a write is in flight, or left over by a failed one,
+        are picked up by the next round instead of waiting for another change.
+        """
         while True:
-            code = generate_verification_code()
-            # Make sure it's not already used
-            if code not in codes.values():
-                break
-        
-        codes[user_id] = code
-        
-        # Save the updated codes
+            await asyncio.sleep(self.flush_delay)
+            if not self._pending:
+                return
+            # Swapped out on the loop, so the thread never touches the map get() adds to
+            pending, self._pending = self._pending, {}
+            if not await self.store.run(self._write, pending):
+                self._pending = {**pending, **self._pending}
+
+    def flush(self):
+        """Write every queued code to the store"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        if not self._write(pending):
+            self._pending = {**pending, **self._pending}
+
+    def _write(self, pending: Dict[str, str]) -> bool:
+        """Save codes, returning False if they have to stay queued"""
         try:
-            with open(VERIFICATION_CODES_FILE, 'w') as f:
-                json.dump(codes, f, indent=2)
+            self.store.save_verification_codes(pending)
         except Exception as e:
             logging.error(f"Error saving verification codes: {e}")
-    
-    return codes[user_id]
+            return False
+        return True
 
-async def verify_me_bio(address: str, user_id: str) -> bool:
-    """Verify if the user has put their verification code in their ME bio"""
-    await check_rate_limit()
+verification_codes = VerificationCodeRegistry(store, CODE_FLUSH_DELAY)
+
+def get_user_verification_code(user_id: str) -> str:
+    """Get or create a verification code for a user"""
+    return verification_codes.get(user_id)
+
+me_bio_flights = SingleFlight('me_bio')
+
+async def fetch_me_bio(address: str) -> Optional[str]:
+    """Fetch a wallet's Magic Eden bio, sharing the request with concurrent callers
+
+    Returns the bio ('' if empty), or None if it couldn't be fetched.
+    """
+    return await me_bio_flights.run(normalize_address(address), _fetch_me_bio, address.strip())
+
+async def _fetch_me_bio(address: str) -> Optional[str]:
     try:
-        # Get the user's verification code
-        verification_code = await get_user_verification_code(user_id)
-        
-        logging.info(f"\nChecking Magic Eden bio for address: {address}")
-        logging.info(f"Looking for verification code: {verification_code}")
-        
         url = f"{MAGICEDEN_API}{address}"
-        logging.info(f"Making request to: {url}")
-        
-        response = requests.get(url)
-        logging.info(f"Response status code: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            logging.info(f"Raw API response: {json.dumps(data, indent=2)}")
-            
-            bio = data.get('bio', '')
-            logging.info(f"Found bio: {bio!r}")
-            
-            if not bio:
-                logging.info("Bio is empty")
-                return False
-                
-            bio = bio.strip()
-            result = verification_code in bio
-            logging.info(f"Verification code ({verification_code}) found in bio: {result}")
-            logging.info(f"Bio content: {bio!r}")
-            return result
-        else:
-            logging.error(f"Error response from Magic Eden API: {response.text}")
-            return False
+        logging.debug(f"Making request to: {url}")
+
+        async with upstream_request(magiceden_limiter, url) as response:
+            logging.debug(f"Response status code: {response.status}")
+
+            if response.status != 200:
+                logging.error(f"Error response from Magic Eden API: {await response.text()}")
+                return None
+
+            data = await response.json(content_type=None)
+
+        logging.debug(f"Magic Eden response for {address}: {data}")
+        return (data.get('bio') or '').strip()
     except Exception as e:
         logging.error(f"Error checking ME bio: {e}", exc_info=True)
+        return None
+
+class BioCache:
+    """Magic Eden bios keyed by wallet address
+
+    A bio that contains the user's code is reused for ME_BIO_POSITIVE_TTL.
+    One that doesn't expires after ME_BIO_NEGATIVE_TTL, so an edited bio is
+    picked up quickly. Independently of the TTLs, an address is fetched at
+    most once per ME_BIO_REFRESH_FLOOR, so repeated submits can't burn the
+    Magic Eden budget. Callers arriving while a fetch is in flight wait for
+    it through me_bio_flights.
+    """
+
+    def __init__(self, positive_ttl: int, negative_ttl: int, refresh_floor: int, max_entries: int):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_floor = refresh_floor
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._bios: Dict[str, Tuple[str, float]] = {}  # address -> (bio, fetched at)
+        self._last_fetch: Dict[str, float] = {}  # address -> when its last fetch completed
+
+    async def get(self, address: str, verification_code: str) -> Optional[str]:
+        """Get a bio from the cache or Magic Eden, or None if it couldn't be fetched"""
+        key = normalize_address(address)
+        now = time.monotonic()
+        cached = self._bios.get(key)
+        if cached is not None:
+            bio, fetched_at = cached
+            ttl = self.positive_ttl if verification_code in bio else self.negative_ttl
+            if now - fetched_at < ttl:
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache='me_bio', result='hit')
+                return bio
+
+        if now - self._last_fetch.get(key, float('-inf')) < self.refresh_floor:
+            # A fetch completed moments ago: answer from it rather than asking again
+            if cached is not None:
+                self.hits += 1
+                CACHE_REQUESTS.inc(cache='me_bio', result='hit')
+                return cached[0]
+            # That fetch failed; don't retry yet
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache='me_bio', result='miss')
+            return None
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache='me_bio', result='miss')
+        # Concurrent callers for the same address join one in-flight fetch
+        bio = await fetch_me_bio(address)
+        self._last_fetch[key] = time.monotonic()
+        if bio is not None:
+            self._bios[key] = (bio, self._last_fetch[key])
+            if len(self._bios) > self.max_entries:
+                self._prune()
+        return bio
+
+    def _prune(self):
+        now = time.monotonic()
+        max_ttl = max(self.positive_ttl, self.negative_ttl, self.refresh_floor)
+        self._bios = {key: entry for key, entry in self._bios.items() if now - entry[1] < max_ttl}
+        self._last_fetch = {
+            key: fetched for key, fetched in self._last_fetch.items()
+            if now - fetched < self.refresh_floor
+        }
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+bio_cache = BioCache(ME_BIO_POSITIVE_TTL, ME_BIO_NEGATIVE_TTL, ME_BIO_REFRESH_FLOOR, ME_BIO_CACHE_SIZE)
+
+async def verify_me_bio(address: str, user_id: str) -> bool:
+    """Verify if the user has put their verification code in their ME bio"""
+    # Get the user's verification code
+    verification_code = get_user_verification_code(user_id)
+
+    logging.info(f"Checking Magic Eden bio for address: {address}")
+
+    bio = await bio_cache.get(address, verification_code)
+    if not bio:
+        logging.info("Bio is empty" if bio == '' else "Could not fetch bio")
         return False
 
+    result = verification_code in bio
+    logging.info(f"Verification code found in bio of {address}: {result}")
+    logging.debug(f"Bio content: {bio!r}")
+    return result
+
+async def process_sweep_job(http: 'discord.http.HTTPClient', job: dict) -> Tuple[str, dict]:
+    """Reconcile one member for a worker; returns the job's final status and result"""
+    payload = json.loads(job['payload'])
+    managed = ManagedRoles(
+        {slug: int(role_id) for slug, role_id in payload['roles'].items()},
+        [(RoleRule.from_dict(rule), int(role_id)) for rule, role_id in payload.get('rules', [])]
+    )
+    addresses = store.load_user_addresses(job['user_id'])
+    holdings = await collect_holdings(addresses, managed.slugs)
+    changed = await store.run(store.save_holdings, job['user_id'], holdings, managed.slugs)
+
+    current = set(payload['current'])
+    desired = managed.evaluate(addresses, holdings)
+    to_add = sorted(desired - current)
+    to_remove = sorted((set(managed.roles) - desired) & current)
+    # Per-role endpoints so roles changed since the job was queued are never overwritten
+    reason = 'Ordinal holder verification'
+    try:
+        async with role_edit_scheduler.slot():
+            for role_id in to_add:
+                await http.add_role(job['guild_id'], job['user_id'], role_id, reason=reason)
+            for role_id in to_remove:
+                await http.remove_role(job['guild_id'], job['user_id'], role_id, reason=reason)
+    except discord.Forbidden:
+        ROLE_EDITS.inc(outcome='forbidden')
+        return 'failed', {'error': 'missing permissions to modify roles'}
+    except discord.NotFound:
+        return 'done', {'error': 'member left the guild'}
+    if to_add or to_remove:
+        ROLE_EDITS.inc(outcome='ok')
+    return 'done', {'added': to_add, 'removed': to_remove, 'changed': changed, 'held': sorted(holdings)}
+
+async def run_sweep_worker():
+    """Take reconciliation jobs from the queue until stopped
+
+    Started with --worker next to a bot running with SWEEP_MODE=queue. Several
+    workers can share a queue; each logs in over REST only, without a gateway
+    connection.
+    """
+    global snapshot_cache
+    snapshot_cache = SnapshotCache(SNAPSHOT_TTL, SNAPSHOT_DIR, follower=True)
+    request_priority.set(PRIORITY_BACKGROUND)
+    worker = f'worker-{os.getpid()}'
+    client = discord.Client(intents=discord.Intents.none())
+    await client.login(BOT_TOKEN)
+    try:
+        await start_metrics_server()
+    except OSError as e:
+        logging.error(f'Could not start metrics server on port {METRICS_PORT}: {e}')
+    logging.info(f'Sweep worker {worker} started')
+
+    async def run_job(job: dict):
+        if job['attempts'] >= SWEEP_JOB_MAX_ATTEMPTS:
+            await store.run(store.finish_sweep_job, job['id'], 'failed',
+                            {'error': f'gave up after {job["attempts"]} attempts'})
+            return
+        try:
+            status, result = await process_sweep_job(client.http, job)
+        except Exception as e:
+            logging.error(f"Error processing user {job['user_id']}: {e}")
+            retry = job['attempts'] + 1 < SWEEP_JOB_MAX_ATTEMPTS
+            status, result = ('queued' if retry else 'failed'), {'error': str(e)}
+        await store.run(store.finish_sweep_job, job['id'], status, result)
+
+    try:
+        while True:
+            jobs = await store.run(store.claim_sweep_jobs, worker, SWEEP_CONCURRENCY)
+            if not jobs:
+                await asyncio.sleep(SWEEP_POLL_INTERVAL)
+                continue
+            await asyncio.gather(*(run_job(job) for job in jobs))
+    finally:
+        await client.close()
+        await close_http_session()
+        store.close()
+
 def is_bot_running():
     """Check if another instance of the bot is running using a lock file"""
     lock_file = Path('bot.lock')
@@ -862,6 +3527,13 @@ def remove_lock_file():
 
 # Run the bot
 if __name__ == "__main__":
+    if SWEEP_WORKER:
+        try:
+            asyncio.run(run_sweep_worker())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     try:
         if is_bot_running():
             logging.error("Bot is already running. Exiting.")
@@ -875,7 +3547,8 @@ if __name__ == "__main__":
         # Make sure we remove the lock file even if the bot crashes
         try:
             logging.info("Attempting to start bot...")
-            bot.run(BOT_TOKEN)
+            startup.mark('imports')
+            bot.run(BOT_TOKEN, log_handler=None)
         except Exception as e:
             logging.error(f"Error running bot: {e}", exc_info=True)
             raise